@@ -0,0 +1,133 @@
+import time
+
+from cachetools import TTLCache
+from fastapi_cache.backends import Backend
+from redis.asyncio import Redis
+
+from api.config.config import CACHE_L1_MAXSIZE, CACHE_L1_TTL
+
+# Записать значение, только если в кэше нет той же или более новой
+# версии строки. Версия лежит рядом со значением в ключе "<key>:version":
+# само значение может быть сжато, и Lua его не разберёт
+SET_IF_NEWER = """
+local current = redis.call('GET', KEYS[2])
+if current and tonumber(current) >= tonumber(ARGV[2]) then
+    return 0
+end
+if tonumber(ARGV[3]) > 0 then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+else
+    redis.call('SET', KEYS[1], ARGV[1])
+    redis.call('SET', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+
+# Значения кэша - двоичные данные кодека (маркер формата, zlib),
+# а fastapi-cache передаёт их строками. latin-1 переводит байт в символ
+# и обратно один к одному, поэтому строки в Redis пишутся байтами
+def to_redis(value: str) -> bytes:
+    return value.encode('latin-1')
+
+
+def from_redis(value: bytes | None) -> str | None:
+    return None if value is None else value.decode('latin-1')
+
+
+class TwoTierBackend(Backend):
+    """
+    Бэкенд fastapi-cache с локальным LRU/TTL-кэшем (L1) перед Redis (L2).
+    Попадание в L1 не требует обращения к Redis и десериализации ответа.
+    Ключи содержат поколения тегов, поэтому после инвалидации
+    старые записи L1 просто перестают читаться и вытесняются.
+    Значения - строки, как в Backend; в Redis они пишутся через to_redis.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        maxsize: int = CACHE_L1_MAXSIZE,
+        ttl: int = CACHE_L1_TTL
+    ):
+        self.redis = redis
+        # key -> (момент истечения записи в Redis, значение)
+        self.local: TTLCache[str, tuple[float, str]] = TTLCache(
+            maxsize=maxsize,
+            ttl=ttl
+        )
+
+    def _get_local(self, key: str) -> tuple[int, str | None]:
+        entry = self.local.get(key)
+        if entry is None:
+            return 0, None
+        expires_at, value = entry
+        ttl = int(expires_at - time.monotonic())
+        if ttl <= 0:
+            self.local.pop(key, None)
+            return 0, None
+        return ttl, value
+
+    def _set_local(self, key: str, value: str, ttl: int | None) -> None:
+        expires_at = time.monotonic() + (ttl if ttl and ttl > 0 else CACHE_L1_TTL)
+        self.local[key] = (expires_at, value)
+
+    async def get_with_ttl(self, key: str) -> tuple[int, str | None]:
+        ttl, value = self._get_local(key)
+        if value is not None:
+            return ttl, value
+
+        async with self.redis.pipeline() as pipe:
+            ttl, stored = await pipe.ttl(key).get(key).execute()
+        value = from_redis(stored)
+        if value is not None:
+            self._set_local(key, value, ttl)
+        return ttl, value
+
+    async def get(self, key: str) -> str | None:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: str, expire: int | None = None) -> None:
+        await self.redis.set(key, to_redis(value), ex=expire)
+        self._set_local(key, value, expire)
+
+    async def set_if_newer(
+        self,
+        key: str,
+        value: str,
+        version: int,
+        expire: int | None = None
+    ) -> bool:
+        """
+        Сравнить и записать по версии строки (колонка version):
+        запись с более старой версией не вытеснит более новую,
+        в каком бы порядке ни завершились конкурентные записи.
+        """
+
+        stored = await self.redis.eval(
+            SET_IF_NEWER,
+            2,
+            key,
+            f'{key}:version',
+            to_redis(value),
+            version,
+            expire or 0
+        )
+        if stored:
+            self._set_local(key, value, expire)
+        else:
+            # В Redis уже более новая версия: локальная копия устарела
+            self.local.pop(key, None)
+        return bool(stored)
+
+    async def clear(self, namespace: str | None = None, key: str | None = None) -> int:
+        if namespace:
+            for local_key in [k for k in self.local if k.startswith(namespace)]:
+                self.local.pop(local_key, None)
+            lua = f"for i, name in ipairs(redis.call('KEYS', '{namespace}:*')) do redis.call('DEL', name); end"
+            return await self.redis.eval(lua, 0)
+        if key:
+            self.local.pop(key, None)
+            return await self.redis.delete(key)
+        return 0
@@ -0,0 +1,10 @@
+from redis.asyncio import Redis
+
+from api.config.config import REDIS_DB, REDIS_HOST, REDIS_PORT
+
+# Асинхронный клиент Redis: бэкенд fastapi-cache и счётчики поколений
+redis_client = Redis(
+    host=str(REDIS_HOST),
+    port=int(REDIS_PORT) if REDIS_PORT is not None else 6379,
+    db=int(REDIS_DB) if REDIS_DB is not None else 0,
+)
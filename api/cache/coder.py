@@ -0,0 +1,51 @@
+import zlib
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache.coder import Coder
+
+from api.config.config import CACHE_COMPRESS_LEVEL, CACHE_COMPRESS_MIN_SIZE
+
+# Первый байт значения в Redis описывает формат остальных байт.
+# Управляющие символы не встречаются в начале JSON-текста.
+JSON = b'\x01'
+TEXT = b'\x02'
+ZLIB = b'\x03'
+
+
+class OrjsonCoder(Coder):
+    """
+    Компактный кодек для fastapi-cache.
+    - Объекты сериализуются orjson (ORM-объекты - через jsonable_encoder).
+    - Строки (готовый JSON из Postgres) хранятся как есть,
+    без повторного экранирования внутри JSON.
+    - Значения крупнее CACHE_COMPRESS_MIN_SIZE сжимаются zlib.
+    Записи старого JsonCoder без маркера читаются как обычный JSON.
+    Как и Coder, работает со строками: байты значения переводятся
+    в символы latin-1 (см. api.cache.backend.to_redis).
+    """
+
+    @classmethod
+    def encode(cls, value: Any) -> str:
+        if isinstance(value, str):
+            payload = TEXT + value.encode()
+        else:
+            payload = JSON + orjson.dumps(value, default=jsonable_encoder)
+
+        if len(payload) >= CACHE_COMPRESS_MIN_SIZE:
+            payload = ZLIB + zlib.compress(payload, CACHE_COMPRESS_LEVEL)
+        return payload.decode('latin-1')
+
+    @classmethod
+    def decode(cls, value: str) -> Any:
+        data = value.encode('latin-1')
+        if data[:1] == ZLIB:
+            data = zlib.decompress(data[1:])
+
+        marker, payload = data[:1], data[1:]
+        if marker == JSON:
+            return orjson.loads(payload)
+        if marker == TEXT:
+            return payload.decode()
+        return orjson.loads(data)
@@ -0,0 +1,227 @@
+import asyncio
+import inspect
+import logging
+from collections.abc import Awaitable, Callable
+from functools import update_wrapper
+from typing import Any, Generic, ParamSpec, TypeVar
+
+from fastapi_cache import FastAPICache
+
+from api.config.config import CACHE_REPLICA_TTL, CACHE_STALE_TTL
+from api.data.database import AsyncReadSessionLocal, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+# Вычисления, идущие прямо сейчас: ключ кэша -> задача
+_inflight: dict[str, asyncio.Task] = {}
+# Ссылки на фоновые обновления, чтобы их не собрал сборщик мусора
+_refreshing: set[asyncio.Task] = set()
+
+
+async def _build_key(
+    func: Callable,
+    namespace: str,
+    args: tuple,
+    kwargs: dict
+) -> str:
+    key = FastAPICache.get_key_builder()(
+        func,
+        namespace,
+        request=None,
+        response=None,
+        args=args,
+        kwargs=kwargs
+    )
+    if inspect.isawaitable(key):
+        key = await key
+    return key
+
+
+async def _single_flight(key: str, compute: Callable[[], Awaitable[R]]) -> R:
+    """
+    Выполнить compute один раз на ключ: конкурентные вызовы
+    с тем же ключом ждут результат уже запущенного вычисления.
+    """
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(compute())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+def _version_of(value: Any) -> int | None:
+    # Версия строки (колонка version) у записи одной сущности
+    if isinstance(value, dict):
+        version = value.get('version')
+    else:
+        version = getattr(value, 'version', None)
+    return version if isinstance(version, int) else None
+
+
+async def _store(key: str, value: Any, expire: int) -> None:
+    backend = FastAPICache.get_backend()
+    version = _version_of(value)
+    try:
+        encoded = FastAPICache.get_coder().encode(value)
+        if version is not None and hasattr(backend, 'set_if_newer'):
+            await backend.set_if_newer(key, encoded, version, expire)
+        else:
+            await backend.set(key, encoded, expire)
+    except Exception:
+        logger.warning(f'Не удалось записать ключ кэша {key}', exc_info=True)
+
+
+async def _compute_and_store(
+    key: str,
+    func: Callable[..., Awaitable[R]],
+    args: tuple,
+    kwargs: dict,
+    expire: int
+) -> R:
+    result = await func(*args, **kwargs)
+    await _store(key, result, expire)
+    return result
+
+
+async def _compute_in_own_session(
+    key: str,
+    func: Callable[..., Awaitable[R]],
+    args: tuple,
+    kwargs: dict,
+    expire: int,
+    stale_ttl: int
+) -> R:
+    """
+    Вычислить запись в собственной сессии: результат общий для всех
+    ждущих вызовов, а сессия запроса, запустившего вычисление, может
+    быть закрыта раньше (запрос отменён или уже отдал устаревшее значение).
+    Сессия открывается на том же сервере, куда был направлен запрос
+    (реплика или основной сервер в окне read-your-writes, см. get_read_db),
+    без сессии запроса - на основном. Запись с реплики свежа не дольше
+    CACHE_REPLICA_TTL секунд, а строка с version не вытесняет более
+    новую, уже записанную после изменения (см. _store).
+    """
+
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    session_factory = getattr(
+        bound.arguments.get('db'), 'session_factory', AsyncSessionLocal
+    )
+    if session_factory is AsyncReadSessionLocal:
+        expire = min(expire, CACHE_REPLICA_TTL)
+
+    async with session_factory() as session:
+        if 'db' in bound.arguments:
+            bound.arguments['db'] = session
+        return await _compute_and_store(
+            key, func, bound.args, bound.kwargs, expire + stale_ttl
+        )
+
+
+async def _revalidate(
+    key: str,
+    func: Callable[..., Awaitable[R]],
+    args: tuple,
+    kwargs: dict,
+    expire: int,
+    stale_ttl: int
+) -> None:
+    try:
+        await _single_flight(
+            key,
+            lambda: _compute_in_own_session(
+                key, func, args, kwargs, expire, stale_ttl
+            )
+        )
+    except Exception:
+        logger.warning(f'Не удалось обновить ключ кэша {key}', exc_info=True)
+
+
+class CachedFunction(Generic[P, R]):
+    """
+    Функция, обёрнутая cache: вызывается как исходная, но читает
+    результат из кэша. Метод prime(*args, value=...) записывает готовое
+    значение в ключ, который прочитает вызов с теми же аргументами
+    (write-through после записи в БД); исходная функция - __wrapped__.
+    """
+
+    __wrapped__: Callable[P, Awaitable[R]]
+
+    def __init__(
+        self,
+        func: Callable[P, Awaitable[R]],
+        expire: int | None,
+        namespace: str,
+        stale_ttl: int
+    ) -> None:
+        update_wrapper(self, func)
+        self.expire = expire
+        self.namespace = namespace
+        self.stale_ttl = stale_ttl
+
+    def fresh_ttl(self) -> int:
+        return self.expire or FastAPICache.get_expire() or 0
+
+    async def prime(self, *args: Any, value: Any, **kwargs: Any) -> None:
+        if not FastAPICache.get_enable():
+            return
+        key = await _build_key(self.__wrapped__, self.namespace, args, kwargs)
+        await _store(key, value, self.fresh_ttl() + self.stale_ttl)
+
+    async def __call__(self, *args: P.args, **kwargs: P.kwargs) -> R:
+        func = self.__wrapped__
+        if not FastAPICache.get_enable():
+            return await func(*args, **kwargs)
+
+        key = await _build_key(func, self.namespace, args, kwargs)
+
+        try:
+            ttl, cached = await FastAPICache.get_backend().get_with_ttl(key)
+        except Exception:
+            logger.warning(f'Не удалось прочитать ключ кэша {key}', exc_info=True)
+            ttl, cached = 0, None
+
+        if cached is not None:
+            if ttl <= self.stale_ttl and key not in _inflight:
+                task = asyncio.ensure_future(_revalidate(
+                    key, func, args, kwargs, self.fresh_ttl(), self.stale_ttl
+                ))
+                _refreshing.add(task)
+                task.add_done_callback(_refreshing.discard)
+            return FastAPICache.get_coder().decode(cached)
+
+        return await _single_flight(
+            key,
+            lambda: _compute_in_own_session(
+                key, func, args, kwargs, self.fresh_ttl(), self.stale_ttl
+            )
+        )
+
+
+def cache(
+    expire: int | None = None,
+    namespace: str = '',
+    stale_ttl: int = CACHE_STALE_TTL
+) -> Callable[[Callable[P, Awaitable[R]]], CachedFunction[P, R]]:
+    """
+    Кэшировать результат функции в бэкенде fastapi-cache.
+    - Промахи по одному ключу схлопываются: БД опрашивает
+    только одна задача в собственной сессии, вызовы ждут её результата.
+    Записи, прочитанные с реплики, свежи не дольше CACHE_REPLICA_TTL.
+    - Запись хранится expire + stale_ttl секунд. Последние stale_ttl
+    секунд она считается устаревшей: её всё ещё отдают,
+    а в фоне запускается одно обновление (stale-while-revalidate).
+    Ключ, бэкенд и кодек берутся из FastAPICache.init.
+    Возвращает CachedFunction с методом prime. Значения с колонкой version
+    записываются сравнением версий: конкурентные записи, завершившиеся
+    не по порядку, не оставят в кэше более старую строку.
+    """
+
+    def wrapper(func: Callable[P, Awaitable[R]]) -> CachedFunction[P, R]:
+        return CachedFunction(func, expire, namespace, stale_ttl)
+
+    return wrapper
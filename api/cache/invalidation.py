@@ -1,16 +1,343 @@
+import asyncio
+import inspect
+import logging
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+from uuid import UUID, uuid4
+
 from cachetools import TTLCache
+from redis.exceptions import RedisError
+
+from api.cache.client import redis_client
+from api.config.config import (
+    CACHE_EXPIRE,
+    CACHE_L1_MAXSIZE,
+    CACHE_L1_TTL,
+    CACHE_PREFIX,
+    CACHE_STALE_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Поколение живёт дольше любой записи кэша, собранной с его участием
+GENERATION_EXPIRE = (CACHE_EXPIRE + CACHE_STALE_TTL) * 2
+
+# Канал, по которому воркеры узнают о сброшенных тегах
+INVALIDATION_CHANNEL = f'{CACHE_PREFIX}:invalidate'
+
+# Локальная копия поколений; используется, только пока воркер
+# подписан на INVALIDATION_CHANNEL и получает все инвалидации
+local_generations: TTLCache[str, str] = TTLCache(
+    maxsize=CACHE_L1_MAXSIZE * 4,
+    ttl=CACHE_L1_TTL
+)
+_subscribed = False
+# Растёт при каждой инвалидации: поколения, прочитанные из Redis
+# до неё, в локальную копию уже не записываются
+_epoch = 0
+
+
+def cache_tags(*tags: str) -> Callable:
+    """
+    Пометить кэшируемую функцию тегами, от которых зависит её результат.
+    Теги - шаблоны с именами аргументов функции, например 'menu:{menu_id}'.
+    Декоратор ставится под @cache.
+    """
+
+    def wrapper(func: Callable) -> Callable:
+        func.__cache_tags__ = tags  # type: ignore[attr-defined]
+        return func
+
+    return wrapper
+
+
+def normalize(value: Any) -> str:
+    try:
+        return str(UUID(str(value)))
+    except ValueError:
+        return str(value)
+
+
+def _generation_key(tag: str) -> str:
+    return f'{CACHE_PREFIX}:gen:{tag}'
+
+
+def _seed() -> str:
+    return str(time.time_ns() // 1000)
+
+
+async def _seed_generations(tags: list[str]) -> dict[str, str]:
+    """
+    Создать отсутствующие поколения. Начальное значение - текущее время,
+    а не 0: после очистки Redis поколения не повторяют прежние,
+    и ключи кэша (а с ними и ETag) не совпадут с выданными раньше.
+    """
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for tag in tags:
+            key = _generation_key(tag)
+            pipe.set(key, _seed(), ex=GENERATION_EXPIRE, nx=True)
+            pipe.get(key)
+        results = await pipe.execute()
+    return {
+        tag: generation.decode()
+        for tag, generation in zip(tags, results[1::2])
+    }
+
+
+def resolve_tags(func: Callable, args: tuple, kwargs: dict) -> list[str]:
+    """
+    Подставить значения аргументов вызова в шаблоны тегов функции.
+    """
+
+    tags = getattr(func, '__cache_tags__', ())
+    if not tags:
+        return []
+    arguments = inspect.signature(func).bind_partial(*args, **kwargs).arguments
+    values = {name: normalize(value) for name, value in arguments.items()}
+    return [tag.format(**values) for tag in tags]
+
+
+async def tag_generations(
+    func: Callable,
+    args: tuple,
+    kwargs: dict
+) -> str | None:
+    """
+    Текущие поколения тегов функции для подстановки в ключ кэша.
+    После инвалидации тега ключ меняется, и старая запись
+    больше не читается, а просто дожидается своего TTL.
+    """
+
+    tags = resolve_tags(func, args, kwargs)
+    if not tags:
+        return None
+
+    if _subscribed:
+        known = [local_generations.get(tag) for tag in tags]
+    else:
+        known = [None] * len(tags)
+    missing = [tag for tag, generation in zip(tags, known) if generation is None]
+
+    if missing:
+        epoch = _epoch
+        try:
+            fetched = await redis_client.mget(
+                [_generation_key(tag) for tag in missing]
+            )
+            unseeded = [
+                tag for tag, generation in zip(missing, fetched)
+                if generation is None
+            ]
+            seeded = await _seed_generations(unseeded) if unseeded else {}
+        except RedisError:
+            logger.warning('Не удалось прочитать поколения кэша', exc_info=True)
+            # Без поколений свежесть не гарантирована - читаем мимо кэша
+            return uuid4().hex
+
+        loaded = {
+            tag: generation.decode() if generation else seeded[tag]
+            for tag, generation in zip(missing, fetched)
+        }
+        if _subscribed and epoch == _epoch:
+            local_generations.update(loaded)
+        known = [generation or loaded[tag] for tag, generation in zip(tags, known)]
+
+    return '.'.join(known)
+
+
+def _forget(tags: Iterable[str]) -> None:
+    global _epoch
+
+    _epoch += 1
+    for tag in tags:
+        local_generations.pop(tag, None)
+
+
+async def invalidate(*tags: str) -> None:
+    """
+    Сбросить все записи кэша, помеченные переданными тегами.
+    """
+
+    _forget(tags)
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                key = _generation_key(tag)
+                pipe.set(key, _seed(), nx=True)
+                pipe.incr(key)
+                pipe.expire(key, GENERATION_EXPIRE)
+            pipe.publish(INVALIDATION_CHANNEL, ' '.join(tags))
+            await pipe.execute()
+    except RedisError:
+        logger.warning(f'Не удалось сбросить теги кэша {tags}', exc_info=True)
+
+
+async def listen_for_invalidations() -> None:
+    """
+    Слушать инвалидации других воркеров и забывать локальные поколения
+    сброшенных тегов. Пока подписки нет (старт, обрыв соединения),
+    локальные поколения не используются и читаются из Redis.
+    """
+
+    global _subscribed
+
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                local_generations.clear()
+                _subscribed = True
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    _forget(message['data'].decode().split())
+        except RedisError:
+            logger.warning('Подписка на инвалидации кэша потеряна', exc_info=True)
+        finally:
+            _subscribed = False
+            local_generations.clear()
+        await asyncio.sleep(1)
+
+
+async def invalidate_menu_created() -> None:
+    await invalidate('menus', 'tree')
+
+
+async def invalidate_menu_updated(menu_id: Any) -> None:
+    menu_id = normalize(menu_id)
+    await invalidate('menus', 'tree', f'menu:{menu_id}')
+
+
+async def invalidate_menu_deleted(menu_id: Any) -> None:
+    menu_id = normalize(menu_id)
+    await invalidate(
+        'menus',
+        'tree',
+        f'menu:{menu_id}',
+        f'menu:{menu_id}:submenus',
+        f'menu:{menu_id}:subtree',
+    )
+
+
+async def invalidate_submenu_created(menu_id: Any) -> None:
+    menu_id = normalize(menu_id)
+    await invalidate(
+        'menus',
+        'tree',
+        f'menu:{menu_id}',
+        f'menu:{menu_id}:submenus',
+    )
+
+
+async def invalidate_submenu_updated(menu_id: Any, submenu_id: Any) -> None:
+    menu_id = normalize(menu_id)
+    submenu_id = normalize(submenu_id)
+    await invalidate(
+        'tree',
+        f'menu:{menu_id}:submenus',
+        f'submenu:{submenu_id}',
+    )
+
+
+async def invalidate_submenu_deleted(menu_id: Any, submenu_id: Any) -> None:
+    menu_id = normalize(menu_id)
+    submenu_id = normalize(submenu_id)
+    await invalidate(
+        'menus',
+        'tree',
+        f'menu:{menu_id}',
+        f'menu:{menu_id}:submenus',
+        f'submenu:{submenu_id}',
+        f'submenu:{submenu_id}:dishes',
+        f'submenu:{submenu_id}:subtree',
+    )
+
+
+async def invalidate_dish_created(menu_id: Any, submenu_id: Any) -> None:
+    menu_id = normalize(menu_id)
+    submenu_id = normalize(submenu_id)
+    await invalidate(
+        'menus',
+        'tree',
+        f'menu:{menu_id}',
+        f'menu:{menu_id}:submenus',
+        f'submenu:{submenu_id}',
+        f'submenu:{submenu_id}:dishes',
+    )
 
-# Создаем кэш
-cache: TTLCache[str, None] = TTLCache(maxsize=100, ttl=30)
 
+async def invalidate_dish_updated(
+    menu_id: Any,
+    submenu_id: Any,
+    dish_id: Any
+) -> None:
+    submenu_id = normalize(submenu_id)
+    dish_id = normalize(dish_id)
+    await invalidate(
+        'tree',
+        f'submenu:{submenu_id}:dishes',
+        f'dish:{dish_id}',
+    )
 
-def background_invalidate_menu_list() -> None:
-    cache.pop('menu_list', None)
 
+async def invalidate_dish_deleted(
+    menu_id: Any,
+    submenu_id: Any,
+    dish_id: Any
+) -> None:
+    menu_id = normalize(menu_id)
+    submenu_id = normalize(submenu_id)
+    dish_id = normalize(dish_id)
+    await invalidate(
+        'menus',
+        'tree',
+        f'menu:{menu_id}',
+        f'menu:{menu_id}:submenus',
+        f'submenu:{submenu_id}',
+        f'submenu:{submenu_id}:dishes',
+        f'dish:{dish_id}',
+    )
 
-def background_invalidate_submenu_list() -> None:
-    cache.pop('submenu_list', None)
 
+async def invalidate_bulk_upsert(
+    menu_ids: Iterable[Any],
+    submenu_ids: Iterable[Any],
+    dish_ids: Iterable[Any],
+    submenu_lists: Iterable[Any] = (),
+    dish_lists: Iterable[Any] = (),
+    left_menus: Iterable[Any] = (),
+    left_submenus: Iterable[Any] = ()
+) -> None:
+    """
+    Сбросить одной инвалидацией теги пачки изменённых строк.
+    Параметры:
+    - menu_ids, submenu_ids, dish_ids: изменённые строки
+    (включая родителей с пересчитанными счётчиками).
+    - submenu_lists: меню, у которых изменился список подменю.
+    - dish_lists: подменю, у которых изменился список блюд.
+    - left_menus, left_submenus: прежние родители перенесённых строк,
+    их вложенные пути больше не ведут к этим строкам.
+    """
 
-def background_invalidate_dish_list() -> None:
-    cache.pop('dish_list', None)
+    tags: set[str] = set()
+    for menu_id in map(normalize, menu_ids):
+        tags.update(('menus', f'menu:{menu_id}'))
+    tags.update(
+        f'menu:{normalize(menu_id)}:submenus' for menu_id in submenu_lists
+    )
+    tags.update(f'menu:{normalize(menu_id)}:subtree' for menu_id in left_menus)
+    tags.update(f'submenu:{normalize(submenu_id)}' for submenu_id in submenu_ids)
+    tags.update(
+        f'submenu:{normalize(submenu_id)}:dishes' for submenu_id in dish_lists
+    )
+    tags.update(
+        f'submenu:{normalize(submenu_id)}:subtree'
+        for submenu_id in left_submenus
+    )
+    tags.update(f'dish:{normalize(dish_id)}' for dish_id in dish_ids)
+    if not tags:
+        return
+    await invalidate('tree', *sorted(tags))
@@ -0,0 +1,52 @@
+import inspect
+from collections.abc import Callable
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from api.cache.invalidation import normalize, tag_generations
+from api.config.config import CACHE_PREFIX
+
+# Аргументы, которые не влияют на результат и не попадают в ключ
+IGNORED_ARGUMENTS = frozenset({'db', 'request', 'response'})
+
+
+def build_cache_key(
+    func: Callable,
+    namespace: str,
+    args: tuple,
+    kwargs: dict
+) -> str:
+    """
+    Детерминированный ключ кэша: префикс, пространство имён сущности,
+    имя функции и значения id и параметров запроса.
+    Сессия БД в ключ не входит, поэтому повторный запрос
+    с теми же параметрами попадает в тот же ключ.
+    """
+
+    arguments = inspect.signature(func).bind_partial(*args, **kwargs).arguments
+    params = ':'.join(
+        f'{name}={normalize(value)}'
+        for name, value in arguments.items()
+        if name not in IGNORED_ARGUMENTS
+    )
+    return f'{CACHE_PREFIX}:{namespace}:{func.__name__}:{params}'
+
+
+async def key_builder(
+    func: Callable,
+    namespace: str = '',
+    request: Request | None = None,
+    response: Response | None = None,
+    args: tuple | None = None,
+    kwargs: dict | None = None,
+) -> str:
+    """
+    Ключ кэша для fastapi-cache с текущими поколениями тегов функции.
+    """
+
+    args = args or ()
+    kwargs = kwargs or {}
+    key = build_cache_key(func, namespace, args, kwargs)
+    generations = await tag_generations(func, args, kwargs)
+    return f'{key}:{generations}' if generations else key
@@ -1,14 +1,35 @@
 import asyncio
+import hashlib
+import os
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from typing import Any
 from uuid import UUID
 
 import httpx
 import pandas as pd
-from pandas.core.series import Series
 
+from api.cache.client import redis_client
+from api.celery2.workbook import (
+    DishRow,
+    MenuRow,
+    SheetRow,
+    SubmenuRow,
+    read_menu_frames,
+    read_menu_rows,
+)
 from api.celery.celery import celery
 from api.celery.send_email import send_email
-from api.config.config import BASE_URL, URL
+from api.config.config import BASE_URL, URL, XLSX_SYNC_CONCURRENCY, XLSX_SYNC_MODE
+from api.data.database import AsyncSessionLocal
 from api.main import app
+from api.service.bulk import upsert_menu_tree
+
+# Таблица, из которой синхронизируется меню
+XLSX_PATH = 'api/admin/Menu.xlsx'
+# Слепок последней синхронизации в Redis: mtime и хэш файла,
+# дайджесты строк (id из таблицы -> "дайджест id в БД")
+XLSX_FILE_KEY = 'xlsx-sync:file'
+XLSX_ROWS_KEY = 'xlsx-sync:rows'
 
 
 @celery.task
@@ -22,170 +43,443 @@ def send_menu_created_email(menu_title, menu_description):
     send_email(subject, message, to_email)
 
 
-async def process_menu_row(row: Series, app_url: str) -> dict:
-    """Обрабатывает CRUD-операции для строки меню в Excel"""
+async def process_menu_row(
+    row: MenuRow,
+    app_url: str,
+    client: httpx.AsyncClient,
+    db_id: str | None = None
+) -> dict:
+    """
+    Обрабатывает CRUD-операции для строки меню в Excel.
+    db_id - id меню в БД из прошлой синхронизации, если строка уже
+    отправлялась; иначе используется id из таблицы.
+    """
 
-    async with httpx.AsyncClient(base_url=BASE_URL) as client:
-        menu_id = row.iloc[0]
-        title = row.iloc[1]
-        description = row.iloc[2]
+    menu_id = db_id or row.id
+    title = row.title
+    description = row.description
 
-        data = {
-            'id': menu_id,
-            'title': title,
-            'description': description,
-        }
-        keys = set(data.keys())
+    data = {
+        'id': menu_id,
+        'title': title,
+        'description': description,
+    }
+    keys = set(data.keys())
+
+    response = await client.get(
+        f'http://api:8000/api/v1/menus/{menu_id}'
+    )
+    response_json = response.json()
 
-        response = await client.get(
-            f'http://api:8000/api/v1/menus/{menu_id}'
+    if response.status_code == 404:
+        result = await client.post(
+            'http://api:8000/api/v1/menus', json=data
         )
-        response_json = response.json()
+        print(f'Меню создано:\n{result.json()}')
 
-        if response.status_code == 404:
-            result = await client.post(
-                'http://api:8000/api/v1/menus', json=data
-            )
-            print(f'Меню создано:\n{result.json()}')
+    elif response.status_code == 200 and all(response_json[key] == data[key] for key in keys):
+        print('Нет изменений для обновления')
+        return data
 
-        elif response.status_code == 200 and all(response_json[key] == data[key] for key in keys):
-            print('Нет изменений для обновления')
-            return data
+    else:
+        result = await client.patch(
+            app.url_path_for('update_current_menu', menu_id=menu_id), json=data
+        )
+        print('Меню обновлено!')
 
-        else:
-            result = await client.patch(
-                app.url_path_for('update_current_menu', menu_id=menu_id), json=data
-            )
-            print('Меню обновлено!')
+    return result.json()
 
-        return result.json()
 
+async def process_submenu_row(
+    row: SubmenuRow,
+    menu_id: UUID,
+    client: httpx.AsyncClient,
+    db_id: str | None = None
+) -> dict:
+    """
+    Обрабатывает CRUD-операции для строки подменю в Excel.
+    db_id - id подменю в БД из прошлой синхронизации (см. process_menu_row).
+    """
 
-async def process_submenu_row(row: Series, menu_id: UUID) -> dict:
-    """Обрабатывает CRUD-операции для строки подменю в Excel"""
+    submenu_id = db_id or row.id
+    title = row.title
+    description = row.description
 
-    async with httpx.AsyncClient(base_url=BASE_URL) as client:
-        submenu_id = row.iloc[1]
-        title = row.iloc[2]
-        description = row.iloc[3]
+    data = {
+        'id': submenu_id,
+        'title': title,
+        'description': description,
+    }
+    keys = set(data.keys())
 
-        data = {
-            'id': submenu_id,
-            'title': title,
-            'description': description,
-        }
-        keys = set(data.keys())
+    response = await client.get(
+        f'http://api:8000/api/v1/menus/{menu_id}/submenus/{submenu_id}'
+    )
 
-        response = await client.get(
-            f'http://api:8000/api/v1/menus/{menu_id}/submenus/{submenu_id}'
+    response_json = response.json()
+
+    if response.status_code == 404:
+        result = await client.post(
+            f'http://api:8000/api/v1/menus/{menu_id}/submenus', json=data
+        )
+        print(f'Подменю создано:\n{result.json()}')
+
+    elif response.status_code == 200 and all(response_json[key] == data[key] for key in keys):
+        print('Нет изменений для обновления')
+        return data
+
+    else:
+        result = await client.patch(
+            app.url_path_for(
+                'update_current_submenu', submenu_id=submenu_id, menu_id=menu_id
+            ),
+            json=data,
         )
+        print('Подменю обновлено!')
 
-        response_json = response.json()
+    return result.json()
 
-        if response.status_code == 404:
-            result = await client.post(
-                f'http://api:8000/api/v1/menus/{menu_id}/submenus', json=data
-            )
-            print(f'Подменю создано:\n{result.json()}')
 
-        elif response.status_code == 200 and all(response_json[key] == data[key] for key in keys):
-            print('Нет изменений для обновления')
-            return data
+async def process_dish_row(
+    row: DishRow,
+    menu_id: UUID,
+    submenu_id: UUID,
+    client: httpx.AsyncClient,
+    db_id: str | None = None
+) -> dict:
+    """
+    Обрабатывает CRUD-операции для строки блюда в Excel.
+    db_id - id блюда в БД из прошлой синхронизации (см. process_menu_row).
+    """
 
-        else:
-            result = await client.patch(
-                app.url_path_for(
-                    'update_current_submenu', submenu_id=submenu_id, menu_id=menu_id
-                ),
-                json=data,
-            )
-            print('Подменю обновлено!')
+    dish_id = db_id or row.id
+    title = row.title
+    description = row.description
+    price = row.price
+
+    data = {
+        'id': dish_id,
+        'title': title,
+        'description': description,
+        'price': price,
+    }
+    keys = set(data.keys())
+
+    response = await client.get(
+        f'http://api:8000/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}'
+    )
 
-        return result.json()
+    response_json = response.json()
 
+    if response.status_code == 404:
+        result = await client.post(
+            f'http://api:8000/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes', json=data
+        )
+        print(f'Блюдо создано:\n{result.json()}')
 
-async def process_dish_row(row: Series, menu_id: UUID, submenu_id: UUID):
-    """Обрабатывает CRUD-операции для строки блюда в Excel"""
+    elif response.status_code == 200 and all(response_json[key] == data[key] for key in keys):
+        print('Нет изменений для обновления')
+        return data
 
-    async with httpx.AsyncClient(base_url=BASE_URL) as client:
-        dish_id = row.iloc[2]
-        title = row.iloc[3]
-        description = row.iloc[4]
-        price = str(row.iloc[5])
+    else:
+        result = await client.patch(
+            f'http://api:8000/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}',
+            json=data,
+        )
+        print('Блюдо обновлено!')
 
-        data = {
-            'id': dish_id,
-            'title': title,
-            'description': description,
-            'price': price,
-        }
-        keys = set(data.keys())
+    return result.json()
 
-        response = await client.get(
-            f'http://api:8000/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}'
-        )
 
-        response_json = response.json()
+# Хэш содержимого файла
+def file_digest(path: str) -> str:
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-        if response.status_code == 404:
-            result = await client.post(
-                f'http://api:8000/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes', json=data
-            )
-            print(f'Блюдо создано:\n{result.json()}')
 
-        elif response.status_code == 200 and all(response_json[key] == data[key] for key in keys):
-            print('Нет изменений для обновления')
-            return None
+# Дайджест строки таблицы вместе с id родителей: перенос
+# подменю или блюда в другое меню тоже считается изменением
+def row_digest(*values: Any) -> str:
+    content = '\x1f'.join(str(value) for value in values)
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+# id в БД для строки, не изменившейся с прошлой синхронизации
+def unchanged_id(
+    digests: dict[str, tuple[str, str]],
+    row_id: str,
+    digest: str
+) -> str | None:
+    stored = digests.get(row_id)
+    if stored is not None and stored[0] == digest:
+        return stored[1]
+    return None
+
+
+async def workbook_changes(path: str) -> dict[str, str] | None:
+    """
+    Проверить, изменился ли файл с последней синхронизации.
+    Сначала сравнивается mtime, и только если он другой - хэш содержимого.
+
+    Параметры:
+    - path: путь к файлу XLSX.
+
+    Возвращает:
+    - Новый слепок файла (mtime и hash) или None, если файл не менялся.
+    """
+
+    state = {
+        key.decode(): value.decode()
+        for key, value in (await redis_client.hgetall(XLSX_FILE_KEY)).items()
+    }
+    mtime = str(os.stat(path).st_mtime_ns)
+    if state.get('mtime') == mtime:
+        return None
+    content_hash = file_digest(path)
+    if state.get('hash') == content_hash:
+        # Файл перезаписан без изменений: запоминаем новый mtime
+        await redis_client.hset(XLSX_FILE_KEY, 'mtime', mtime)
+        return None
+    return {'mtime': mtime, 'hash': content_hash}
+
+
+async def load_row_digests() -> dict[str, tuple[str, str]]:
+    digests: dict[str, tuple[str, str]] = {}
+    for key, value in (await redis_client.hgetall(XLSX_ROWS_KEY)).items():
+        digest, db_id = value.decode().split(' ', 1)
+        digests[key.decode()] = (digest, db_id)
+    return digests
+
+
+async def save_sync_state(
+    rows: dict[str, str],
+    file_state: dict[str, str] | None
+) -> None:
+    """
+    Сохранить дайджесты обработанных строк и, если синхронизация
+    прошла целиком, слепок файла. Только после полной синхронизации
+    набор дайджестов заменяется целиком, забывая удалённые из таблицы строки.
+    """
+
+    async with redis_client.pipeline(transaction=True) as pipe:
+        if file_state is not None:
+            pipe.delete(XLSX_ROWS_KEY)
+            pipe.hset(XLSX_FILE_KEY, mapping=file_state)
+        if rows:
+            pipe.hset(XLSX_ROWS_KEY, mapping=rows)
+        await pipe.execute()
+
+
+# Строка меню с вложенными строками подменю и блюд
+MenuGroup = tuple[MenuRow, list[tuple[SubmenuRow, list[DishRow]]]]
+
+
+def group_rows(rows: Iterable[SheetRow]) -> Iterator[MenuGroup]:
+    """
+    Разложить строки таблицы по иерархии: меню -> подменю -> блюда.
+    Таблица упорядочена по меню, поэтому группы отдаются по одной,
+    как только начинается следующее меню: в памяти держится только
+    текущая группа, а не вся таблица.
+    """
+
+    menu: MenuRow | None = None
+    submenus: list[tuple[SubmenuRow, list[DishRow]]] = []
+    for row in rows:
+
+        if isinstance(row, MenuRow):
+            if menu is not None:
+                yield menu, submenus
+            menu, submenus = row, []
+
+        elif isinstance(row, SubmenuRow):
+            submenus.append((row, []))
 
         else:
-            result = await client.patch(
-                f'http://api:8000/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}',
-                json=data,
-            )
-            print('Блюдо обновлено!')
+            submenus[-1][1].append(row)
 
-        return result.json()
+    if menu is not None:
+        yield menu, submenus
 
 
-async def track_xlsx_to_db(app_url: str) -> None:
+async def send_rows_to_api(
+    rows: Iterable[SheetRow],
+    digests: dict[str, tuple[str, str]],
+    synced: dict[str, str],
+    app_url: str
+) -> int:
     """
-    Функция для отслеживания файла XLSX и
-    преобразования таблиц в базу данных
+    Синхронизировать изменённые строки таблицы через API.
+    Родитель обрабатывается раньше детей, а соседние строки (все меню,
+    подменю одного меню, блюда одного подменю) - параллельно через
+    один пул соединений, не больше XLSX_SYNC_CONCURRENCY строк сразу.
+    Таблица читается по мере отправки: одновременно в работе
+    не больше XLSX_SYNC_CONCURRENCY меню со своими подменю и блюдами.
+    Дайджест каждой обработанной строки сразу записывается в synced.
+
+    Возвращает:
+    - Число строк, отправленных в API.
     """
 
-    menu_list: list[dict] = []
-    menu_counter: int = -1
-    submenu_counter: int = 0
+    semaphore = asyncio.Semaphore(XLSX_SYNC_CONCURRENCY)
+    processed = 0
+
+    async def sync_row(
+        row_id: str,
+        digest: str,
+        process: Callable[..., Awaitable[dict]],
+        *args: Any
+    ) -> str:
+        # id строки в БД: из прошлой синхронизации или из ответа API
+        nonlocal processed
+
+        stored_id = unchanged_id(digests, row_id, digest)
+        if stored_id is None:
+            # Изменённая строка обновляется по id в БД из прошлой
+            # синхронизации, а не по id из таблицы
+            known_id = digests[row_id][1] if row_id in digests else None
+            async with semaphore:
+                result = await process(*args, client, db_id=known_id)
+            processed += 1
+            stored_id = str(result['id']) if result else known_id or row_id
+        synced[row_id] = f'{digest} {stored_id}'
+        return stored_id
+
+    async def sync_submenu(
+        menu_id: str,
+        row: SubmenuRow,
+        dishes: list[DishRow]
+    ) -> None:
+        submenu_id = await sync_row(
+            row.id,
+            row_digest(menu_id, row.id, row.title, row.description),
+            process_submenu_row,
+            row,
+            menu_id
+        )
+        async with asyncio.TaskGroup() as group:
+            for dish in dishes:
+                group.create_task(sync_row(
+                    dish.id,
+                    row_digest(
+                        submenu_id,
+                        dish.id,
+                        dish.title,
+                        dish.description,
+                        dish.price
+                    ),
+                    process_dish_row,
+                    dish,
+                    menu_id,
+                    submenu_id
+                ))
+
+    async def sync_menu(
+        row: MenuRow,
+        submenus: list[tuple[SubmenuRow, list[DishRow]]]
+    ) -> None:
+        menu_id = await sync_row(
+            row.id,
+            row_digest(row.id, row.title, row.description),
+            process_menu_row,
+            row,
+            app_url
+        )
+        async with asyncio.TaskGroup() as group:
+            for submenu, dishes in submenus:
+                group.create_task(sync_submenu(menu_id, submenu, dishes))
 
-    menu_df = pd.read_excel('api/admin/Menu.xlsx', header=None)
+    limits = httpx.Limits(
+        max_connections=XLSX_SYNC_CONCURRENCY,
+        max_keepalive_connections=XLSX_SYNC_CONCURRENCY
+    )
+    async with httpx.AsyncClient(base_url=BASE_URL, limits=limits) as client:
+        menus = asyncio.Semaphore(XLSX_SYNC_CONCURRENCY)
+        async with asyncio.TaskGroup() as group:
+            for menu, submenus in group_rows(rows):
+                await menus.acquire()
+                task = group.create_task(sync_menu(menu, submenus))
+                task.add_done_callback(lambda _: menus.release())
 
-    for index, row in menu_df.iterrows():
+    return processed
 
-        if pd.notnull(row.iloc[0]):
-            submenu_counter = -1
-            menu = await process_menu_row(row, app_url)
-            menu['submenus'] = []
-            menu_list.append(menu)
-            menu_counter += 1
 
-        elif row.iloc[1:4].notna().all():
-            submenu = await process_submenu_row(
-                row, menu_list[menu_counter]['id']
+# Дайджесты строк DataFrame одной векторной операцией
+def frame_digests(frame: pd.DataFrame) -> pd.Series:
+    return pd.util.hash_pandas_object(frame, index=False).astype(str)
+
+
+async def upsert_frames_to_db(
+    frames: tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame],
+    digests: dict[str, tuple[str, str]],
+    synced: dict[str, str]
+) -> int:
+    """
+    Синхронизировать изменённые строки таблицы напрямую в БД
+    пакетной записью upsert_menu_tree. id из таблицы - это id в БД.
+    Изменённые строки отбираются сравнением колонки дайджестов
+    с сохранёнными, без обхода строк в Python.
+
+    Возвращает:
+    - Число изменённых в БД строк.
+    """
+
+    stored = pd.Series(
+        {row_id: digest for row_id, (digest, _) in digests.items()},
+        dtype=object
+    )
+    changed_rows: list[list[dict[str, Any]]] = []
+    digested: dict[str, str] = {}
+
+    for frame in frames:
+        digest = frame_digests(frame)
+        changed = digest.ne(frame['id'].map(stored))
+        changed_rows.append(frame[changed].to_dict('records'))
+        digested.update(zip(frame['id'], digest + ' ' + frame['id']))
+
+    async with AsyncSessionLocal() as db:
+        changed_counts = await upsert_menu_tree(db, *changed_rows)
+    # Дайджесты запоминаются только после фиксации транзакции
+    synced.update(digested)
+    return sum(changed_counts.values())
+
+
+async def track_xlsx_to_db(app_url: str) -> int | None:
+    """
+    Функция для отслеживания файла XLSX и
+    преобразования таблиц в базу данных.
+    Неизменённый файл не читается, а из изменённого синхронизируются
+    только строки, дайджест которых изменился: через API или, при
+    XLSX_SYNC_MODE='db', пакетной записью напрямую в БД.
+
+    Возвращает:
+    - Число обработанных строк или None, если файл не менялся.
+    """
+
+    file_state = await workbook_changes(XLSX_PATH)
+    if file_state is None:
+        return None
+    digests = await load_row_digests()
+    synced: dict[str, str] = {}
+
+    try:
+        if XLSX_SYNC_MODE == 'db':
+            processed = await upsert_frames_to_db(
+                read_menu_frames(XLSX_PATH), digests, synced
             )
-            submenu['dishes'] = []
-            menu_list[menu_counter]['submenus'].append(submenu)
-            submenu_counter += 1
-
-        elif row.iloc[2:6].notna().all():
-            current_menu = menu_list[menu_counter]
-            current_submenu = current_menu['submenus'][submenu_counter]
-            dish = await process_dish_row(
-                row,
-                menu_id=current_menu['id'],
-                submenu_id=current_submenu['id']
+        else:
+            processed = await send_rows_to_api(
+                read_menu_rows(XLSX_PATH), digests, synced, app_url
             )
-            (menu_list[menu_counter]['submenus']
-             [submenu_counter]['dishes'].append(dish))
+    except Exception:
+        # Уже синхронизированные строки в следующий раз не повторяются
+        await save_sync_state(synced, None)
+        raise
+
+    await save_sync_state(synced, file_state)
+    return processed
 
 
 @celery.task
@@ -196,7 +490,7 @@ def run_xlsx_tracking():
     app_url = f'/{URL}'
     try:
         result = loop.run_until_complete(track_xlsx_to_db(app_url))
-        if result is None:
+        if not result:
             print('Обновлений нет')
         return result
     except Exception as e:
@@ -0,0 +1,197 @@
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, fields
+from typing import Any
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# Ширина таблицы: id меню, подменю, блюда со сдвигом на колонку,
+# название, описание и цена блюда
+SHEET_WIDTH = 6
+
+
+# Строки таблицы меню. Поля совпадают с колонками моделей,
+# поэтому запись превращается в строку для INSERT через as_row()
+class SheetRecord:
+    __slots__ = ()
+
+    def as_row(self) -> dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+@dataclass(slots=True, frozen=True)
+class MenuRow(SheetRecord):
+    id: str
+    title: str
+    description: str | None
+
+
+@dataclass(slots=True, frozen=True)
+class SubmenuRow(SheetRecord):
+    id: str
+    title: str
+    description: str | None
+    menu_id: str
+
+
+@dataclass(slots=True, frozen=True)
+class DishRow(SheetRecord):
+    id: str
+    title: str
+    description: str | None
+    price: str
+    submenu_id: str
+
+
+SheetRow = MenuRow | SubmenuRow | DishRow
+
+
+def read_cells(path: str) -> Iterator[tuple[Any, ...]]:
+    """
+    Читать значения ячеек первого листа построчно. Файл открывается
+    в режиме read_only: строки разбираются по мере чтения XML,
+    и в памяти держится только текущая.
+    """
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        for values in sheet.iter_rows(max_col=SHEET_WIDTH, values_only=True):
+            yield values + (None,) * (SHEET_WIDTH - len(values))
+    finally:
+        workbook.close()
+
+
+def parse_rows(cells: Iterable[tuple[Any, ...]]) -> Iterator[SheetRow]:
+    """
+    Разобрать строки таблицы по отступу: меню в колонке 0, подменю
+    в колонке 1, блюдо в колонке 2. Подменю и блюдо получают id
+    родителя из последней строки меню или подменю выше (в пределах
+    того же меню).
+    Строки, не подходящие ни под один вид, пропускаются.
+    """
+
+    menu_id = submenu_id = None
+    for number, values in enumerate(cells, start=1):
+
+        if values[0] is not None:
+            menu_id = str(values[0])
+            submenu_id = None
+            yield MenuRow(menu_id, values[1], values[2])
+
+        elif all(value is not None for value in values[1:4]):
+            if menu_id is None:
+                raise ValueError(f'Строка {number}: подменю вне меню')
+            submenu_id = str(values[1])
+            yield SubmenuRow(submenu_id, values[2], values[3], menu_id)
+
+        elif all(value is not None for value in values[2:6]):
+            if submenu_id is None:
+                raise ValueError(f'Строка {number}: блюдо вне подменю')
+            yield DishRow(
+                str(values[2]),
+                values[3],
+                values[4],
+                str(values[5]),
+                submenu_id
+            )
+
+
+def read_menu_rows(path: str) -> Iterator[SheetRow]:
+    """
+    Лениво читать меню, подменю и блюда из файла XLSX.
+    """
+
+    return parse_rows(read_cells(path))
+
+
+# Цена приводится к строке при чтении, как в parse_rows: иначе pandas
+# соберёт колонку цен во float и целая цена 200 станет '200.0'
+def _priced_cells(path: str) -> Iterator[tuple[Any, ...]]:
+    for values in read_cells(path):
+        price = values[5]
+        yield values[:5] + (None if price is None else str(price),)
+
+
+# Все строки вида mask должны иметь родителя
+def _check_parents(
+    mask: pd.Series,
+    parent_id: pd.Series,
+    message: str
+) -> None:
+    orphans = mask & parent_id.isna()
+    if orphans.any():
+        number = orphans.to_numpy().argmax() + 1
+        raise ValueError(f'Строка {number}: {message}')
+
+
+# Строки вида mask с колонками модели; пустые ячейки - None
+def _frame(mask: pd.Series, **columns: pd.Series) -> pd.DataFrame:
+    frame = pd.DataFrame(columns)[mask].astype(object)
+    return frame.where(frame.notna(), None).reset_index(drop=True)
+
+
+def parse_frames(
+    sheet: pd.DataFrame
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Разобрать всю таблицу по колонкам, без обхода строк в Python:
+    вид строки определяется булевыми масками по заполненности ячеек,
+    id родителей протягиваются вниз через ffill (id подменю - только
+    в пределах своего меню). Правила те же, что у parse_rows.
+
+    Параметры:
+    - sheet: значения ячеек листа без заголовка, колонки 0..5;
+      цены - строками или dtype=object (см. read_menu_frames).
+
+    Возвращает:
+    - Меню (id, title, description), подменю (+ menu_id) и блюда
+      (id, title, description, price, submenu_id) - три DataFrame
+      с колонками моделей, готовые к сравнению и пакетной записи.
+    """
+
+    sheet = sheet.reindex(columns=range(SHEET_WIDTH))
+    filled = sheet.notna()
+    is_menu = filled[0]
+    is_submenu = ~is_menu & filled[[1, 2, 3]].all(axis=1)
+    is_dish = ~is_menu & ~is_submenu & filled[[2, 3, 4, 5]].all(axis=1)
+
+    menu_id = sheet[0].where(is_menu).ffill()
+    submenu_id = sheet[1].where(is_submenu).groupby(is_menu.cumsum()).ffill()
+    _check_parents(is_submenu, menu_id, 'подменю вне меню')
+    _check_parents(is_dish, submenu_id, 'блюдо вне подменю')
+
+    menus = _frame(
+        is_menu,
+        id=sheet[0].astype(str),
+        title=sheet[1],
+        description=sheet[2]
+    )
+    submenus = _frame(
+        is_submenu,
+        id=sheet[1].astype(str),
+        title=sheet[2],
+        description=sheet[3],
+        menu_id=menu_id.astype(str)
+    )
+    dishes = _frame(
+        is_dish,
+        id=sheet[2].astype(str),
+        title=sheet[3],
+        description=sheet[4],
+        price=sheet[5].astype(str),
+        submenu_id=submenu_id.astype(str)
+    )
+    return menus, submenus, dishes
+
+
+def read_menu_frames(
+    path: str
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Прочитать меню, подменю и блюда из файла XLSX тремя DataFrame.
+    Векторный разбор держит в памяти весь лист: режим синхронизации
+    'db' требует O(строк) памяти, потоковый разбор - read_menu_rows.
+    """
+
+    return parse_frames(pd.DataFrame.from_records(_priced_cells(path)))
@@ -8,12 +8,50 @@ load_dotenv()
 BASE_URL = 'http://localhost:8000'
 URL = 'api/v1/menus'
 
+# Сколько меню читается из серверного курсора за один раз при экспорте
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '100'))
+
+# Размер страницы для списков меню, подменю и блюд
+PAGE_LIMIT = int(os.getenv('PAGE_LIMIT', '100'))
+PAGE_LIMIT_MAX = int(os.getenv('PAGE_LIMIT_MAX', '1000'))
+# Проверять ответы схемами response_model (медленнее); по умолчанию
+# данные из БД и кэша кодируются orjson без повторной валидации
+RESPONSE_VALIDATION = (
+    os.getenv('RESPONSE_VALIDATION', 'false').lower() == 'true'
+)
+
+# Синхронизация меню из api/admin/Menu.xlsx: 'http' - через API,
+# 'db' - пакетной записью напрямую в БД (id из таблицы становятся id в БД)
+XLSX_SYNC_MODE = os.getenv('XLSX_SYNC_MODE', 'http')
+# Сколько строк пишется одним INSERT ... ON CONFLICT в режиме 'db'
+XLSX_SYNC_BATCH_SIZE = int(os.getenv('XLSX_SYNC_BATCH_SIZE', '1000'))
+# Сколько строк одновременно отправляется в API в режиме 'http'
+XLSX_SYNC_CONCURRENCY = int(os.getenv('XLSX_SYNC_CONCURRENCY', '10'))
+
 
 DB_HOST = os.environ.get('DB_HOST')
 DB_PORT = os.environ.get('DB_PORT')
 DB_NAME = os.environ.get('DB_NAME')
 DB_USER = os.environ.get('DB_USER')
 DB_PASS = os.environ.get('DB_PASS')
+# Реплика для чтения (GET); по умолчанию тот же сервер, что и для записи
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST', DB_HOST)
+DB_REPLICA_PORT = os.getenv('DB_REPLICA_PORT', DB_PORT)
+# Сколько секунд после записи клиент читает с основного сервера,
+# чтобы видеть свои изменения несмотря на отставание реплики (0 - выкл.)
+READ_YOUR_WRITES_WINDOW = int(os.getenv('READ_YOUR_WRITES_WINDOW', '0'))
+# Пул соединений каждого воркера: постоянные соединения и сверх них
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '20'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+# Сколько секунд ждать свободного соединения, прежде чем вернуть ошибку
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# Проверять соединение перед выдачей из пула (переживает рестарт БД)
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+# Кэш подготовленных выражений на соединение; 0 - для pgbouncer
+# в режиме transaction
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '500'))
+# Логирование каждого SQL-запроса, только для отладки
+DB_ECHO = os.getenv('DB_ECHO', 'false').lower() == 'true'
 
 
 REDIS_HOST = os.environ.get('REDIS_HOST')
@@ -21,6 +59,23 @@ REDIS_PORT: str | None = os.getenv('REDIS_PORT', '6379')
 REDIS_DB: str | None = os.getenv('REDIS_DB', '0')
 
 
+CACHE_PREFIX = 'fastapi-cache'
+# Записи кэша сбрасываются точечно при записи, поэтому TTL может быть долгим
+CACHE_EXPIRE = int(os.getenv('CACHE_EXPIRE', '3600'))
+# Сколько ещё секунд после истечения отдавать устаревшую запись,
+# пока она обновляется в фоне (stale-while-revalidate)
+CACHE_STALE_TTL = int(os.getenv('CACHE_STALE_TTL', '300'))
+# Сколько секунд свежа запись, прочитанная с реплики: отставание реплики
+# не должно надолго пережить сброс тегов после записи
+CACHE_REPLICA_TTL = int(os.getenv('CACHE_REPLICA_TTL', '5'))
+# Локальный (L1) кэш в памяти каждого воркера перед Redis
+CACHE_L1_MAXSIZE = int(os.getenv('CACHE_L1_MAXSIZE', '1024'))
+CACHE_L1_TTL = int(os.getenv('CACHE_L1_TTL', '60'))
+# Значения кэша крупнее порога (в байтах) сжимаются zlib
+CACHE_COMPRESS_MIN_SIZE = int(os.getenv('CACHE_COMPRESS_MIN_SIZE', '1024'))
+CACHE_COMPRESS_LEVEL = int(os.getenv('CACHE_COMPRESS_LEVEL', '1'))
+
+
 SMTP_USER = os.environ.get('SMTP_USER')
 SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
 SMTP_SERVER = 'smtp.yandex.ru'
@@ -1,12 +1,116 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import time
+from typing import Any
+
+from fastapi import Request, Response
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
 
-from api.config.config import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER
+from api.config.config import (
+    DB_ECHO,
+    DB_HOST,
+    DB_MAX_OVERFLOW,
+    DB_NAME,
+    DB_PASS,
+    DB_POOL_PRE_PING,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_PORT,
+    DB_REPLICA_HOST,
+    DB_REPLICA_PORT,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_USER,
+    READ_YOUR_WRITES_WINDOW,
+)
 
 SQLALCHEMY_DATABASE_URL = (f'postgresql+asyncpg://{DB_USER}:{DB_PASS}'
                            f'@{DB_HOST}:{DB_PORT}/{DB_NAME}')
+SQLALCHEMY_READ_DATABASE_URL = (f'postgresql+asyncpg://{DB_USER}:{DB_PASS}'
+                                f'@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}'
+                                f'/{DB_NAME}')
+
+# Cookie с моментом, до которого клиент читает с основного сервера
+READ_PRIMARY_COOKIE = 'read_primary_until'
+
+
+class PoolMetrics:
+    """
+    Время ожидания соединения из пула, накопительно с запуска воркера.
+    Рост среднего и максимума - признак того, что пул мал для нагрузки.
+    """
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe(self, wait: float) -> None:
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self, pool: Pool) -> dict[str, Any]:
+        return {
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_seconds_total': self.wait_total,
+            'wait_seconds_max': self.wait_max,
+            'wait_seconds_avg': (
+                self.wait_total / self.checkouts if self.checkouts else 0.0
+            ),
+        }
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    metrics: PoolMetrics
 
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=True)
+    # Засекает, сколько запрос ждал соединение (включая открытие нового)
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.observe(time.perf_counter() - started)
+
+
+# Свой класс пула на движок: при пересоздании пула метрики сохраняются
+def timed_pool_class(metrics: PoolMetrics) -> type[TimedQueuePool]:
+    return type('TimedQueuePool', (TimedQueuePool,), {'metrics': metrics})
+
+
+def create_engine_with_profile(url: str, metrics: PoolMetrics) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=DB_ECHO,
+        poolclass=timed_pool_class(metrics),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={
+            # Кэш SQLAlchemy поверх asyncpg и собственный кэш asyncpg
+            'prepared_statement_cache_size': DB_STATEMENT_CACHE_SIZE,
+            'statement_cache_size': DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+
+pool_metrics = PoolMetrics()
+read_pool_metrics = PoolMetrics()
+
+engine = create_engine_with_profile(SQLALCHEMY_DATABASE_URL, pool_metrics)
+read_engine = create_engine_with_profile(
+    SQLALCHEMY_READ_DATABASE_URL,
+    read_pool_metrics
+)
 
 
 AsyncSessionLocal = sessionmaker(
@@ -15,9 +119,83 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
+AsyncReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 
+class LazySession:
+    """
+    Заместитель AsyncSession: сессия создаётся при первом обращении,
+    соединение из пула берётся при первом запросе к БД. Запрос,
+    полностью обслуженный кэшем, не создаёт ни сессии, ни соединения.
+    """
+
+    def __init__(self, session_factory: sessionmaker) -> None:
+        self._session_factory = session_factory
+        self._session: AsyncSession | None = None
+
+    @property
+    def session_factory(self) -> sessionmaker:
+        return self._session_factory
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = self._session_factory()
+        return getattr(self._session, name)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_write_db(response: Response) -> AsyncSession:
+    """
+    Сессия основного сервера для записи. Если включено окно
+    read-your-writes, помечает клиента cookie, чтобы его чтения
+    ближайшие READ_YOUR_WRITES_WINDOW секунд шли на основной сервер.
+    """
+
+    if READ_YOUR_WRITES_WINDOW > 0:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            str(time.time() + READ_YOUR_WRITES_WINDOW),
+            max_age=READ_YOUR_WRITES_WINDOW,
+            httponly=True
+        )
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def reads_from_primary(request: Request) -> bool:
+    try:
+        deadline = float(request.cookies.get(READ_PRIMARY_COOKIE, 0))
+    except ValueError:
+        return False
+    return deadline > time.time()
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    Ленивая сессия реплики для чтения. Клиент, который недавно писал,
+    читает с основного сервера (см. get_write_db). Промахи кэша
+    вычисляются в новой сессии того же сервера (см. cache).
+    """
+
+    session = LazySession(
+        AsyncSessionLocal if reads_from_primary(request)
+        else AsyncReadSessionLocal
+    )
+    try:
+        yield session
+    finally:
+        await session.close()
@@ -1,50 +1,90 @@
-from uuid import UUID, uuid4
-
-from fastapi import BackgroundTasks, HTTPException
-from fastapi_cache.decorator import cache
-from sqlalchemy import update
+from collections.abc import AsyncIterator
+from typing import Any
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import (
+    String,
+    and_,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    update,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import Session
-from sqlalchemy.orm.exc import NoResultFound
 
+from api.cache.decorator import cache
 from api.cache.invalidation import (
-    background_invalidate_dish_list,
-    background_invalidate_menu_list,
-    background_invalidate_submenu_list,
+    cache_tags,
+    invalidate_dish_created,
+    invalidate_dish_deleted,
+    invalidate_dish_updated,
+    invalidate_menu_created,
+    invalidate_menu_deleted,
+    invalidate_menu_updated,
+    invalidate_submenu_created,
+    invalidate_submenu_deleted,
+    invalidate_submenu_updated,
 )
 from api.celery2.tasks import send_menu_created_email
+from api.config.config import CACHE_EXPIRE, EXPORT_CHUNK_SIZE
+from api.data.ids import uuid7
 from api.models.models import Dish, Menu, Submenu
-from api.schemas.schemas import (
-    DishesWithID,
-    DishSchema,
-    MenuSchema,
-    MenuSchemaWithID,
-    SubmenuSchema,
-    SubmenuSchemaWithID,
+from api.models.records import DishRecord, MenuRecord, SubmenuRecord
+from api.schemas.schemas import DishSchema, MenuSchema, SubmenuSchema
+from api.service.service import (
+    decode_cursor,
+    execute_write,
+    fetch_limit,
+    get_menu_or_404,
+    get_path_or_404,
+    paginate,
+    raise_if_missing,
+    raise_if_path_missing,
+    require_row,
+    submenu_in_menu,
 )
-from api.service.service import get_dish_or_404, get_menu_or_404, get_submenu_or_404
-
-background_tasks = BackgroundTasks()
 
 
-@cache(expire=30)
-async def get_menu_list(db: AsyncSession) -> list[Menu]:
+@cache(expire=CACHE_EXPIRE, namespace='menu')
+@cache_tags('menus')
+async def get_menu_list(
+    limit: int | None,
+    cursor: str | None,
+    db: AsyncSession
+) -> tuple[list[MenuRecord], str | None]:
     """
-    Получить список меню из базы данных.
+    Получить страницу списка меню из базы данных.
+    Пагинация курсорная (keyset) по id, без OFFSET.
     Параметры:
+    - limit: int | None - Максимальное число меню на странице
+    (None - весь список).
+    - cursor: str | None - Курсор предыдущей страницы.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
-    - list[Menu]: Список объектов меню.
+    - tuple[list[MenuRecord], str | None]: Список записей меню
+    и курсор следующей страницы (None, если страница последняя).
     """
 
-    stmt = select(Menu)
+    stmt = (
+        MenuRecord.select()
+        .order_by(Menu.id)
+        .limit(fetch_limit(limit))
+    )
+    if cursor is not None:
+        stmt = stmt.where(Menu.id > decode_cursor(cursor))
     result = await db.execute(stmt)
-    menu = result.scalars().all()
-    return menu
+    menu = MenuRecord.from_rows(result)
+    return paginate(menu, limit)
 
 
-@cache(expire=30)
+@cache(expire=CACHE_EXPIRE, namespace='menu')
+@cache_tags('menu:{menu_id}')
 async def get_menu_by_id(menu_id: str, db: AsyncSession) -> Menu:
     """
     Получить объект меню по его идентификатору.
@@ -58,37 +98,41 @@ async def get_menu_by_id(menu_id: str, db: AsyncSession) -> Menu:
     return await get_menu_or_404(menu_id, db)
 
 
-@cache()
-async def create_menu_func(menu: MenuSchema, db: AsyncSession) -> Menu:
+async def create_menu_func(
+    menu: MenuSchema,
+    db: AsyncSession
+) -> dict[str, Any]:
     """
     Создать новое меню и добавить его в базу данных.
     Параметры:
     - menu: MenuSchema - Схема данных нового меню.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
-    - Menu: Созданный объект меню.
+    - dict[str, Any]: Созданное меню (строка из RETURNING).
     """
 
+    menu_row = (
+        insert(Menu)
+        .values(id=uuid7(), title=menu.title, description=menu.description)
+        .returning(*Menu.__table__.c)
+        .cte('menu_row')
+    )
     async with db.begin():
-        new_menu = Menu(
-            id=uuid4(),
-            title=menu.title,
-            description=menu.description,
-        )
-        db.add(new_menu)
+        rows = await execute_write(db, menu=menu_row)
         await db.commit()
 
+    new_menu = require_row(rows, 'menu')
     send_menu_created_email.delay(menu.title, menu.description)
-    background_tasks.add_task(background_invalidate_menu_list)
-    return MenuSchemaWithID(**menu.dict(), id=new_menu.id)
+    await invalidate_menu_created()
+    await get_menu_by_id.prime(new_menu['id'], db, value=new_menu)
+    return new_menu
 
 
-@cache()
 async def put_menu(
     menu_id: str,
     menu: MenuSchema,
     db: AsyncSession
-) -> Menu:
+) -> dict[str, Any]:
     """
     Обновить информацию о существующем меню.
     Параметры:
@@ -96,22 +140,30 @@ async def put_menu(
     - menu: MenuSchema - Схема данных для обновления меню.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
-    - Menu: Обновленный объект меню.
+    - dict[str, Any]: Обновленное меню (строка из RETURNING).
     """
 
+    menu_row = (
+        update(Menu)
+        .where(Menu.id == menu_id)
+        .values(
+            title=menu.title,
+            description=menu.description,
+            version=Menu.version + 1
+        )
+        .returning(*Menu.__table__.c)
+        .cte('menu_row')
+    )
     async with db.begin():
-        current_menu = await get_menu_or_404(menu_id, db)
-        if current_menu:
-            current_menu.title = menu.title
-            current_menu.description = menu.description
-            await db.commit()
-            background_tasks.add_task(background_invalidate_menu_list)
-            return current_menu
-        else:
-            raise HTTPException(status_code=404, detail='menu not found')
-
-
-@cache()
+        rows = await execute_write(db, menu=menu_row)
+        updated_menu = require_row(rows, 'menu')
+        await db.commit()
+
+    await invalidate_menu_updated(menu_id)
+    await get_menu_by_id.prime(menu_id, db, value=updated_menu)
+    return updated_menu
+
+
 async def delete_menu(menu_id: str, db: AsyncSession):
     """
     Удалить меню из базы данных.
@@ -124,62 +176,95 @@ async def delete_menu(menu_id: str, db: AsyncSession):
     генерирует исключение HTTPException с кодом 404.
     """
 
+    menu_row = (
+        delete(Menu)
+        .where(Menu.id == menu_id)
+        .returning(Menu.id)
+        .cte('menu_row')
+    )
     async with db.begin():
-        menu_to_delete = await db.get(Menu, menu_id)
-        if menu_to_delete:
-            await db.delete(menu_to_delete)
-            await db.commit()
-            background_tasks.add_task(background_invalidate_menu_list)
-        else:
-            raise HTTPException(status_code=404, detail='menu not found')
+        rows = await execute_write(db, menu=menu_row)
+        raise_if_missing(rows, 'menu')
+        await db.commit()
 
+    await invalidate_menu_deleted(menu_id)
 
-@cache(expire=30)
+
+@cache(expire=CACHE_EXPIRE, namespace='submenu')
+@cache_tags('menu:{api_test_menu_id}:submenus')
 async def get_list_submenu(
     api_test_menu_id: UUID,
+    limit: int | None,
+    cursor: str | None,
     db: AsyncSession
-) -> list[Submenu]:
+) -> tuple[list[SubmenuRecord], str | None]:
     """
-    Получить список подменю для заданного меню.
+    Получить страницу списка подменю для заданного меню.
+    Пагинация курсорная (keyset) по id, без OFFSET.
     Параметры:
     - api_test_menu_id: UUID - Идентификатор меню,
     для которого нужно получить список подменю.
+    - limit: int | None - Максимальное число подменю на странице
+    (None - весь список).
+    - cursor: str | None - Курсор предыдущей страницы.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
-    - list[Submenu]: Список объектов подменю.
+    - tuple[list[SubmenuRecord], str | None]: Список записей подменю
+    и курсор следующей страницы (None, если страница последняя).
     """
 
+    # Первая страница проверяет меню: иначе неизвестное меню дало бы []
+    if cursor is None:
+        await get_path_or_404(db, api_test_menu_id)
     api_test_menu_id_str = str(api_test_menu_id)
-    stmt = select(Submenu).where(Submenu.menu_id == api_test_menu_id_str)
+    stmt = (
+        SubmenuRecord.select()
+        .where(Submenu.menu_id == api_test_menu_id_str)
+        .order_by(Submenu.id)
+        .limit(fetch_limit(limit))
+    )
+    if cursor is not None:
+        stmt = stmt.where(Submenu.id > decode_cursor(cursor))
     result = await db.execute(stmt)
-    submenu = result.scalars().all()
-    return submenu
+    submenu = SubmenuRecord.from_rows(result)
+    return paginate(submenu, limit)
 
 
-@cache(expire=30)
+@cache(expire=CACHE_EXPIRE, namespace='submenu')
+@cache_tags(
+    'menu:{api_test_menu_id}:subtree',
+    'submenu:{api_test_submenu_id}'
+)
 async def get_submenu_by_id(
-    api_test_submenu_id: str | None,
+    api_test_menu_id: str,
+    api_test_submenu_id: str,
     db: AsyncSession
 ) -> Submenu:
     """
     Получить подменю по его идентификатору.
     Параметры:
-    - api_test_submenu_id: str | None - Идентификатор подменю,
+    - api_test_menu_id: str - Идентификатор меню,
+    к которому принадлежит подменю.
+    - api_test_submenu_id: str - Идентификатор подменю,
     которое нужно получить.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
     - Submenu: Объект подменю.
     """
 
-    return await get_submenu_or_404(api_test_submenu_id, db)
+    _, current_submenu, _ = await get_path_or_404(
+        db,
+        api_test_menu_id,
+        api_test_submenu_id
+    )
+    return current_submenu
 
 
-@cache()
 async def create_submenu_func(
     target_menu_id: str,
     submenu: SubmenuSchema,
     db: AsyncSession
-) -> Submenu:
+) -> dict[str, Any]:
     """
     Создать новое подменю и добавить его в базу данных.
     Параметры:
@@ -188,38 +273,53 @@ async def create_submenu_func(
     - submenu: SubmenuSchema - Схема данных нового подменю.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
-    - Submenu: Созданный объект подменю.
+    - dict[str, Any]: Созданное подменю (строка из RETURNING).
     """
 
-    async with db.begin():
-        current_menu = await get_menu_or_404(target_menu_id, db)
-
-        db_submenu = Submenu(
-            id=uuid4(),
-            title=submenu.title,
-            description=submenu.description,
-            menu_id=target_menu_id
+    # Подменю вставляется, только если UPDATE нашёл меню
+    menu_row = Menu.change_counts(target_menu_id, submenus=1).cte('menu_row')
+    submenu_row = (
+        insert(Submenu)
+        .from_select(
+            ['id', 'title', 'description', 'menu_id'],
+            select(
+                literal(uuid7(), Submenu.id.type),
+                literal(submenu.title),
+                literal(submenu.description),
+                menu_row.c.id
+            )
         )
-        current_menu.add_submenu_count(1)
-        db.add(db_submenu)
+        .returning(*Submenu.__table__.c)
+        .cte('submenu_row')
+    )
+    async with db.begin():
+        rows = await execute_write(db, menu=menu_row, submenu=submenu_row)
+        await raise_if_path_missing(rows, db, target_menu_id)
         await db.commit()
 
-    background_tasks.add_task(background_invalidate_submenu_list)
-
-    return SubmenuSchemaWithID(
-        **submenu.dict(),
-        id=db_submenu.id,
-        menu_id=target_menu_id
+    new_submenu = require_row(rows, 'submenu')
+    await invalidate_submenu_created(target_menu_id)
+    await get_menu_by_id.prime(
+        target_menu_id,
+        db,
+        value=require_row(rows, 'menu')
+    )
+    await get_submenu_by_id.prime(
+        target_menu_id,
+        new_submenu['id'],
+        db,
+        value=new_submenu
     )
 
+    return new_submenu
+
 
-@cache()
 async def put_submenu(
     api_test_menu_id: str,
     api_test_submenu_id: str,
     submenu_update: SubmenuSchema,
     db: AsyncSession
-) -> Submenu:
+) -> dict[str, Any]:
     """
     Обновить информацию о существующем подменю.
     Параметры:
@@ -229,7 +329,7 @@ async def put_submenu(
     - submenu_update: SubmenuSchema - Схема данных для обновления подменю.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
-    - Submenu: Обновленный объект подменю.
+    - dict[str, Any]: Обновленное подменю (строка из RETURNING).
     """
 
     if not submenu_update.dict():
@@ -237,26 +337,38 @@ async def put_submenu(
             status_code=400,
             detail='No data provided for update'
         )
+    submenu_row = (
+        update(Submenu)
+        .where(
+            Submenu.id == api_test_submenu_id,
+            Submenu.menu_id == api_test_menu_id
+        )
+        .values(**submenu_update.dict(), version=Submenu.version + 1)
+        .returning(*Submenu.__table__.c)
+        .cte('submenu_row')
+    )
     async with db.begin():
-        current_submenu_to_update = await get_submenu_or_404(
-            api_test_submenu_id,
-            db
+        rows = await execute_write(db, submenu=submenu_row)
+        await raise_if_path_missing(
+            rows,
+            db,
+            api_test_menu_id,
+            api_test_submenu_id
         )
-
-        await db.execute(update(Submenu).where(
-            Submenu.id == api_test_submenu_id
-        ).values(**submenu_update.dict()))
-
         await db.commit()
 
-    await db.refresh(current_submenu_to_update)
-
-    background_tasks.add_task(background_invalidate_submenu_list)
+    updated_submenu = require_row(rows, 'submenu')
+    await invalidate_submenu_updated(api_test_menu_id, api_test_submenu_id)
+    await get_submenu_by_id.prime(
+        api_test_menu_id,
+        api_test_submenu_id,
+        db,
+        value=updated_submenu
+    )
 
-    return current_submenu_to_update
+    return updated_submenu
 
 
-@cache()
 async def delete_submenu(
     api_test_menu_id: str,
     api_test_submenu_id: str,
@@ -275,69 +387,131 @@ async def delete_submenu(
     генерирует исключение HTTPException с кодом 404.
     """
 
+    # Число блюд берётся из RETURNING удалённой строки: пока она
+    # заблокирована, новые блюда в это подменю не добавятся
+    submenu_row = (
+        delete(Submenu)
+        .where(
+            Submenu.id == api_test_submenu_id,
+            Submenu.menu_id == api_test_menu_id
+        )
+        .returning(*Submenu.__table__.c)
+        .cte('submenu_row')
+    )
+    menu_row = Menu.change_counts(
+        submenu_row.c.menu_id,
+        submenus=-1,
+        dishes=-submenu_row.c.dishes_count
+    ).cte('menu_row')
     async with db.begin():
-        current_menu = await get_menu_or_404(api_test_menu_id, db)
-
-        try:
-            current_submenu_to_delete = await get_submenu_or_404(
-                api_test_submenu_id,
-                db
-            )
-
-            dish_count = current_submenu_to_delete.dishes_count
-            current_menu.delete_submenu_count(1)
-            current_menu.delete_dishes_count(dish_count)
-            await db.delete(current_submenu_to_delete)
-            await db.commit()
-
-            background_tasks.add_task(background_invalidate_submenu_list)
+        rows = await execute_write(db, submenu=submenu_row, menu=menu_row)
+        await raise_if_path_missing(
+            rows,
+            db,
+            api_test_menu_id,
+            api_test_submenu_id
+        )
+        await db.commit()
 
-            return current_submenu_to_delete
-        except NoResultFound:
-            raise HTTPException(status_code=404, detail='Submenu not found')
+    await invalidate_submenu_deleted(api_test_menu_id, api_test_submenu_id)
+    await get_menu_by_id.prime(
+        api_test_menu_id,
+        db,
+        value=require_row(rows, 'menu')
+    )
 
 
-@cache(expire=30)
-async def get_list_dish(submenu_id: UUID, db: AsyncSession) -> list[Dish]:
+@cache(expire=CACHE_EXPIRE, namespace='dish')
+@cache_tags('menu:{menu_id}:subtree', 'submenu:{submenu_id}:dishes')
+async def get_list_dish(
+    menu_id: UUID,
+    submenu_id: UUID,
+    limit: int | None,
+    cursor: str | None,
+    db: AsyncSession
+) -> tuple[list[DishRecord], str | None]:
     """
-    Получить список блюд для заданного подменю.
+    Получить страницу списка блюд для заданного подменю.
+    Пагинация курсорная (keyset) по id, без OFFSET.
     Параметры:
+    - menu_id: UUID - Идентификатор меню,
+    к которому принадлежит подменю.
     - submenu_id: UUID - Идентификатор подменю,
     для которого нужно получить список блюд.
+    - limit: int | None - Максимальное число блюд на странице
+    (None - весь список).
+    - cursor: str | None - Курсор предыдущей страницы.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
-    - list[Dish]: Список объектов блюд.
+    - tuple[list[DishRecord], str | None]: Список записей блюд
+    и курсор следующей страницы (None, если страница последняя).
     """
 
+    # Первая страница проверяет путь: иначе подменю чужого
+    # или несуществующего меню дало бы []
+    if cursor is None:
+        await get_path_or_404(db, menu_id, submenu_id)
     submenu_id_str = str(submenu_id)
-    current_dishes = select(Dish).where(
-        Dish.submenu_id == submenu_id_str)
+    # Соединение с подменю отсекает подменю чужого меню
+    current_dishes = (
+        DishRecord.select()
+        .join(Submenu, and_(
+            Submenu.id == Dish.submenu_id,
+            Submenu.menu_id == str(menu_id)
+        ))
+        .where(Dish.submenu_id == submenu_id_str)
+        .order_by(Dish.id)
+        .limit(fetch_limit(limit))
+    )
+    if cursor is not None:
+        current_dishes = current_dishes.where(
+            Dish.id > decode_cursor(cursor)
+        )
     result = await db.execute(current_dishes)
-    dishes_list = result.scalars().all()
-    return dishes_list
+    dishes_list = DishRecord.from_rows(result)
+    return paginate(dishes_list, limit)
 
 
-@cache(expire=30)
-async def get_dish_by_id(dish_id: str, db: AsyncSession) -> Dish:
+@cache(expire=CACHE_EXPIRE, namespace='dish')
+@cache_tags(
+    'menu:{menu_id}:subtree',
+    'submenu:{submenu_id}:subtree',
+    'dish:{dish_id}'
+)
+async def get_dish_by_id(
+    menu_id: str,
+    submenu_id: str,
+    dish_id: str,
+    db: AsyncSession
+) -> Dish:
     """
     Получить блюдо по его идентификатору.
     Параметры:
+    - menu_id: str - Идентификатор меню,
+    к которому принадлежит подменю.
+    - submenu_id: str - Идентификатор подменю,
+    к которому принадлежит блюдо.
     - dish_id: str - Идентификатор блюда, которое нужно получить.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
     - Dish: Объект блюда.
     """
 
-    return await get_dish_or_404(dish_id, db)
+    _, _, current_dish = await get_path_or_404(
+        db,
+        menu_id,
+        submenu_id,
+        dish_id
+    )
+    return current_dish
 
 
-@cache()
 async def create_dish_func(
     api_test_menu_id: str,
     api_test_submenu_id: str,
     dish: DishSchema,
     db: AsyncSession
-) -> Dish:
+) -> dict[str, Any]:
     """
     Создать новое блюдо и добавить его в базу данных.
     Параметры:
@@ -348,46 +522,85 @@ async def create_dish_func(
     - dish: DishSchema - Схема данных нового блюда.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
-    - Dish: Созданный объект блюда.
+    - dict[str, Any]: Созданное блюдо (строка из RETURNING).
     """
 
+    # Строки блокируются от листьев к корню: подменю, затем меню
+    submenu_row = (
+        Submenu.change_dishes_count(api_test_submenu_id, 1)
+        .where(Submenu.menu_id == api_test_menu_id)
+        .cte('submenu_row')
+    )
+    menu_row = Menu.change_counts(
+        submenu_row.c.menu_id,
+        dishes=1
+    ).cte('menu_row')
+    dish_row = (
+        insert(Dish)
+        .from_select(
+            ['id', 'title', 'description', 'price', 'submenu_id'],
+            select(
+                literal(uuid7(), Dish.id.type),
+                literal(dish.title),
+                literal(dish.description),
+                literal(dish.price),
+                submenu_row.c.id
+            ).select_from(
+                submenu_row.join(
+                    menu_row,
+                    menu_row.c.id == submenu_row.c.menu_id
+                )
+            )
+        )
+        .returning(*Dish.__table__.c)
+        .cte('dish_row')
+    )
     async with db.begin():
-
-        current_menu = await get_menu_or_404(api_test_menu_id, db)
-        current_submenu = await get_submenu_or_404(
-            api_test_submenu_id,
-            db
+        rows = await execute_write(
+            db,
+            submenu=submenu_row,
+            menu=menu_row,
+            dish=dish_row
+        )
+        await raise_if_path_missing(
+            rows,
+            db,
+            api_test_menu_id,
+            api_test_submenu_id
         )
-
-        current_menu.add_dishes_count(1)
-        current_submenu.update_dishes_count(1)
-
-        db_dish = Dish(
-            id=uuid4(),
-            title=dish.title,
-            description=dish.description,
-            price=dish.price,
-            submenu_id=api_test_submenu_id)
-
-        db.add(db_dish)
         await db.commit()
 
-        background_tasks.add_task(background_invalidate_dish_list)
+    new_dish = require_row(rows, 'dish')
+    await invalidate_dish_created(api_test_menu_id, api_test_submenu_id)
+    await get_menu_by_id.prime(
+        api_test_menu_id,
+        db,
+        value=require_row(rows, 'menu')
+    )
+    await get_submenu_by_id.prime(
+        api_test_menu_id,
+        api_test_submenu_id,
+        db,
+        value=require_row(rows, 'submenu')
+    )
+    await get_dish_by_id.prime(
+        api_test_menu_id,
+        api_test_submenu_id,
+        new_dish['id'],
+        db,
+        value=new_dish
+    )
 
-        return DishesWithID(
-            **dish.dict(),
-            id=db_dish.id,
-            submenu_id=api_test_submenu_id
-        )
+    return new_dish
 
 
-@cache()
 async def put_dish(
+    api_test_menu_id: str,
     api_test_submenu_id: str,
     api_test_dish_id: str,
     dish_update: DishSchema,
     db: AsyncSession
-) -> Dish:
+) -> dict[str, Any]:
     """
     Обновить информацию о существующем блюде.
     Параметры:
@@ -399,7 +612,7 @@ async def put_dish(
     - dish_update: DishSchema - Схема данных для обновления блюда.
     - db: AsyncSession - Асинхронная сессия базы данных.
     Возвращает:
-    - Dish: Обновленный объект блюда.
+    - dict[str, Any]: Обновленное блюдо (строка из RETURNING).
     """
 
     if not dish_update.dict():
@@ -407,32 +620,50 @@ async def put_dish(
             status_code=400,
             detail='No data provided for update'
         )
+    dish_row = (
+        update(Dish)
+        .where(
+            Dish.id == api_test_dish_id,
+            Dish.submenu_id == api_test_submenu_id,
+            submenu_in_menu(api_test_submenu_id, api_test_menu_id)
+        )
+        .values(**dish_update.dict(), version=Dish.version + 1)
+        .returning(*Dish.__table__.c)
+        .cte('dish_row')
+    )
     async with db.begin():
-        current_dish_to_update = await get_dish_or_404(api_test_dish_id, db)
-
-        await db.execute(
-            update(Dish)
-            .where(
-                Dish.id == api_test_dish_id,
-                Dish.submenu_id == api_test_submenu_id
-            )
-            .values(**dish_update.dict())
+        rows = await execute_write(db, dish=dish_row)
+        await raise_if_path_missing(
+            rows,
+            db,
+            api_test_menu_id,
+            api_test_submenu_id,
+            api_test_dish_id
         )
-
         await db.commit()
 
-    await db.refresh(current_dish_to_update)
-
-    background_tasks.add_task(background_invalidate_dish_list)
+    updated_dish = require_row(rows, 'dish')
+    await invalidate_dish_updated(
+        api_test_menu_id,
+        api_test_submenu_id,
+        api_test_dish_id
+    )
+    await get_dish_by_id.prime(
+        api_test_menu_id,
+        api_test_submenu_id,
+        api_test_dish_id,
+        db,
+        value=updated_dish
+    )
 
-    return current_dish_to_update
+    return updated_dish
 
 
-@cache()
 async def delete_dish(
+    api_test_menu_id: str,
     api_test_submenu_id: str,
     api_test_dish_id: str,
-    db: Session
+    db: AsyncSession
 ):
     """
     Удалить блюдо из базы данных.
@@ -442,46 +673,180 @@ async def delete_dish(
     - api_test_submenu_id: str - Идентификатор подменю,
     к которому принадлежит блюдо.
     - api_test_dish_id: str - Идентификатор блюда для удаления.
-    - db: Session - Сессия базы данных.
+    - db: AsyncSession - Асинхронная сессия базы данных.
     - В случае успешного удаления блюда, ничего не возвращает.
     - В случае, если блюдо с
     заданным идентификатором не найдено,
     генерирует исключение HTTPException с кодом 404.
     """
 
+    dish_row = (
+        delete(Dish)
+        .where(
+            Dish.id == api_test_dish_id,
+            Dish.submenu_id == api_test_submenu_id
+        )
+        .returning(*Dish.__table__.c)
+        .cte('dish_row')
+    )
+    submenu_row = (
+        Submenu.change_dishes_count(dish_row.c.submenu_id, -1)
+        .where(Submenu.menu_id == api_test_menu_id)
+        .cte('submenu_row')
+    )
+    menu_row = Menu.change_counts(
+        submenu_row.c.menu_id,
+        dishes=-1
+    ).cte('menu_row')
     async with db.begin():
-        current_menu = await get_menu_or_404(api_test_submenu_id, db)
+        rows = await execute_write(
+            db,
+            dish=dish_row,
+            submenu=submenu_row,
+            menu=menu_row
+        )
+        await raise_if_path_missing(
+            rows,
+            db,
+            api_test_menu_id,
+            api_test_submenu_id,
+            api_test_dish_id
+        )
+        await db.commit()
+
+    await invalidate_dish_deleted(
+        api_test_menu_id,
+        api_test_submenu_id,
+        api_test_dish_id
+    )
+    await get_menu_by_id.prime(
+        api_test_menu_id,
+        db,
+        value=require_row(rows, 'menu')
+    )
+    await get_submenu_by_id.prime(
+        api_test_menu_id,
+        api_test_submenu_id,
+        db,
+        value=require_row(rows, 'submenu')
+    )
 
-        try:
-            current_menu.delete_dishes_count(1)
-            current_dish_to_delete = await get_dish_or_404(
-                api_test_dish_id,
-                db
-            )
 
-            await db.delete(current_dish_to_delete)
-            await db.commit()
+def _json_object(**fields):
+    """
+    json_build_object с ключами-литералами: ключи попадают в SQL
+    как строковые константы, а не как параметры без типа.
+    """
 
-            background_tasks.add_task(background_invalidate_dish_list)
+    args = []
+    for key, value in fields.items():
+        args.extend((literal_column(f"'{key}'"), value))
+    return func.json_build_object(*args)
 
-            return current_dish_to_delete
-        except NoResultFound:
-            raise HTTPException(status_code=404, detail='Dish not found')
 
+def _dishes_json():
+    """
+    Коррелированный подзапрос: JSON-массив блюд текущего подменю.
+    """
 
-# Получить все объекты
-@cache(expire=30)
-async def get_all_menus_with_submenus_and_dishes_func(db: AsyncSession):
-    stmt = select(Menu)
-    result = await db.execute(stmt)
-    menu = result.scalars().all()
+    dish = _json_object(
+        id=Dish.id,
+        title=Dish.title,
+        description=Dish.description,
+        price=Dish.price,
+    )
+    return (
+        select(func.coalesce(
+            func.json_agg(aggregate_order_by(dish, Dish.id)),
+            literal_column("'[]'::json")
+        ))
+        .where(Dish.submenu_id == Submenu.id)
+        .correlate(Submenu)
+        .scalar_subquery()
+    )
+
+
+def _submenus_json():
+    """
+    Коррелированный подзапрос: JSON-массив подменю текущего меню
+    вместе с вложенными блюдами.
+    """
+
+    submenu = _json_object(
+        id=Submenu.id,
+        title=Submenu.title,
+        description=Submenu.description,
+        dishes_count=Submenu.dishes_count,
+        dishes=_dishes_json(),
+    )
+    return (
+        select(func.coalesce(
+            func.json_agg(aggregate_order_by(submenu, Submenu.id)),
+            literal_column("'[]'::json")
+        ))
+        .where(Submenu.menu_id == Menu.id)
+        .correlate(Menu)
+        .scalar_subquery()
+    )
+
+
+def _menu_json():
+    """
+    JSON-объект меню со всеми подменю и блюдами.
+    """
 
-    stmt = select(Submenu)
+    return _json_object(
+        id=Menu.id,
+        title=Menu.title,
+        description=Menu.description,
+        submenus_count=Menu.submenus_count,
+        dishes_count=Menu.dishes_count,
+        submenus=_submenus_json(),
+    )
+
+
+@cache(expire=CACHE_EXPIRE, namespace='tree')
+@cache_tags('tree')
+async def get_all_menus_with_submenus_and_dishes_func(db: AsyncSession) -> str:
+    """
+    Получить дерево всех меню с подменю и блюдами одним запросом.
+    Дерево собирается в Postgres через json_agg и возвращается
+    готовой JSON-строкой, без создания ORM-объектов.
+    Параметры:
+    - db: AsyncSession - Асинхронная сессия базы данных.
+    Возвращает:
+    - str: JSON-массив меню (menu -> submenus -> dishes).
+    """
+
+    stmt = select(cast(
+        func.coalesce(
+            func.json_agg(aggregate_order_by(_menu_json(), Menu.id)),
+            literal_column("'[]'::json")
+        ),
+        String
+    ))
     result = await db.execute(stmt)
-    submenu = result.scalars().all()
+    return result.scalar()
 
-    current_dishes = select(Dish)
-    result = await db.execute(current_dishes)
-    dishes_list = result.scalars().all()
 
-    return menu, submenu, dishes_list
+async def stream_all_menus_with_submenus_and_dishes(
+    db: AsyncSession
+) -> AsyncIterator[str]:
+    """
+    Потоково выгрузить все меню с подменю и блюдами в формате NDJSON.
+    Меню читаются из серверного курсора пачками по EXPORT_CHUNK_SIZE,
+    каждое меню отдаётся одной JSON-строкой с вложенными подменю и блюдами.
+    Параметры:
+    - db: AsyncSession - Асинхронная сессия базы данных.
+    Возвращает:
+    - AsyncIterator[str]: Пачки строк NDJSON.
+    """
+
+    stmt = (
+        select(cast(_menu_json(), String))
+        .order_by(Menu.id)
+        .execution_options(max_row_buffer=EXPORT_CHUNK_SIZE)
+    )
+    result = await db.stream(stmt)
+    async for rows in result.scalars().partitions(EXPORT_CHUNK_SIZE):
+        yield ''.join(f'{row}\n' for row in rows)
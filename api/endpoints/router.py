@@ -1,10 +1,23 @@
+import hashlib
+from collections.abc import Iterable
+from typing import Any
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status
-from pydantic import UUID4
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from api.data.database import get_db
+from api.cache.invalidation import tag_generations
+from api.config.config import PAGE_LIMIT, PAGE_LIMIT_MAX, RESPONSE_VALIDATION
+from api.data.database import (
+    engine,
+    get_read_db,
+    get_write_db,
+    pool_metrics,
+    read_engine,
+    read_pool_metrics,
+)
 from api.endpoints.crud import (
     create_dish_func,
     create_menu_func,
@@ -22,8 +35,10 @@ from api.endpoints.crud import (
     put_dish,
     put_menu,
     put_submenu,
+    stream_all_menus_with_submenus_and_dishes,
 )
 from api.models import models
+from api.models.records import DishRecord, MenuRecord, SubmenuRecord
 from api.schemas.schemas import (
     CreateDish,
     CreateMenu,
@@ -31,6 +46,7 @@ from api.schemas.schemas import (
     DishesReturn,
     DishesWithID,
     DishSchema,
+    EntityUUID,
     MenuSchema,
     MenuSchemaWithID,
     SubmenuSchema,
@@ -39,9 +55,129 @@ from api.schemas.schemas import (
     UpdateDishes,
     UpdateMenu,
     UpdateSubmenu,
+    serializer_for,
+)
+
+router = APIRouter(
+    prefix='/api/v1',
+    tags=['CRUD'],
+    default_response_class=ORJSONResponse
 )
 
-router = APIRouter(prefix='/api/v1', tags=['CRUD'])
+# Заголовок ответа с курсором следующей страницы списка
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+# Без limit и cursor список отдаётся целиком, как до пагинации;
+# продолжение по курсору без limit идёт страницами по PAGE_LIMIT
+def page_limit(limit: int | None, cursor: str | None) -> int | None:
+    if limit is None and cursor is not None:
+        return PAGE_LIMIT
+    return limit
+
+
+def set_next_cursor(response: Response, next_cursor: str | None) -> None:
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # Слабое сравнение (RFC 9110): префикс W/ не учитывается
+    candidates = (tag.strip() for tag in if_none_match.split(','))
+    return etag in (tag.removeprefix('W/') for tag in candidates)
+
+
+def forwarded_headers(response: Response) -> dict[str, str]:
+    # Заголовки (ETag, курсор, cookie) для ответов, которые возвращаются
+    # напрямую, минуя response; длину тела считает новый ответ
+    return {
+        name: value for name, value in response.headers.items()
+        if name != 'content-length'
+    }
+
+
+def serialized(
+    content: Any,
+    response: Response,
+    schema: type[BaseModel],
+    many: bool = False,
+    status_code: int = status.HTTP_200_OK
+) -> Any:
+    """
+    Быстрый путь ответа: готовый сериализатор схемы и orjson
+    вместо проверки через response_model.
+
+    Параметры:
+    - content: dict из кэша или RETURNING, запись или ORM-объект.
+    - response: ответ с уже выставленными заголовками.
+    - schema: схема ответа маршрута.
+    - many: content - список объектов.
+    - status_code: код ответа маршрута.
+
+    Возвращает:
+    - Готовый JSON-ответ или content без изменений,
+      если включён RESPONSE_VALIDATION.
+    """
+
+    if RESPONSE_VALIDATION:
+        return content
+    return Response(
+        content=serializer_for(schema, many).dumps(content),
+        status_code=status_code,
+        media_type='application/json',
+        headers=forwarded_headers(response)
+    )
+
+
+def strong_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b(
+        '\x1f'.join(str(part) for part in parts).encode(),
+        digest_size=16
+    )
+    return f'"{digest.hexdigest()}"'
+
+
+def version_etag(rows: Iterable[Any], *extra: Any) -> str:
+    # ETag по парам (id, version) строк ответа: dict из кэша
+    # или RETURNING, запись или ORM-объект. Счётчики родителя
+    # меняются вместе с его version (см. Menu.change_counts)
+    return strong_etag(*(
+        f'{row["id"]}:{row["version"]}' if isinstance(row, dict)
+        else f'{row.id}:{row.version}'
+        for row in rows
+    ), *extra)
+
+
+def check_etag(
+    request: Request,
+    response: Response,
+    etag: str
+) -> Response | None:
+    """
+    Условный GET по ETag уже прочитанного (обычно из кэша) ответа.
+    Маршрут читает данные до проверки, поэтому If-None-Match: *
+    для несуществующей сущности не даёт 304: чтение отвечает 404.
+
+    Параметры:
+    - request: входящий запрос с заголовком If-None-Match.
+    - response: ответ, в который записывается ETag.
+    - etag: ETag ответа (version_etag или strong_etag).
+
+    Возвращает:
+    - Ответ 304, если у клиента актуальная версия, иначе None.
+    """
+
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={'ETag': etag}
+        )
+    response.headers['ETag'] = etag
+    return None
 
 
 # Просмотр списка меню
@@ -49,11 +185,32 @@ router = APIRouter(prefix='/api/v1', tags=['CRUD'])
     '/menus',
     response_model=list[MenuSchema],
     summary='Получить список меню',
-    response_description='Список всех меню'
+    response_description=(
+        'Список меню; с limit или cursor - страница, курсор '
+        'следующей страницы в заголовке X-Next-Cursor'
+    )
 )
-async def get_list_menu(db: Session = Depends(get_db)) -> list[models.Menu]:
-    menu = await get_menu_list(db)
-    return menu
+async def get_list_menu(
+    request: Request,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db)
+) -> list[MenuRecord] | Response:
+    menu, next_cursor = await get_menu_list(
+        page_limit(limit, cursor),
+        cursor,
+        db
+    )
+    not_modified = check_etag(
+        request,
+        response,
+        version_etag(menu, next_cursor)
+    )
+    if not_modified is not None:
+        return not_modified
+    set_next_cursor(response, next_cursor)
+    return serialized(menu, response, MenuSchema, many=True)
 
 
 @router.get(
@@ -67,10 +224,15 @@ async def get_list_menu(db: Session = Depends(get_db)) -> list[models.Menu]:
 )
 async def get_target_menu(
     menu_id: str,
-    db: Session = Depends(get_db)
-) -> models.Menu:
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
+) -> models.Menu | Response:
     current_menu = await get_menu_by_id(menu_id, db)
-    return current_menu
+    not_modified = check_etag(request, response, version_etag([current_menu]))
+    if not_modified is not None:
+        return not_modified
+    return serialized(current_menu, response, MenuSchemaWithID)
 
 
 # Создать меню
@@ -83,10 +245,16 @@ async def get_target_menu(
 )
 async def create_menu(
     menu: MenuSchema,
-    db: Session = Depends(get_db)
-) -> models.Menu:
+    response: Response,
+    db: Session = Depends(get_write_db)
+) -> dict[str, Any] | Response:
     created_menu = await create_menu_func(menu, db)
-    return created_menu
+    return serialized(
+        created_menu,
+        response,
+        CreateMenu,
+        status_code=status.HTTP_201_CREATED
+    )
 
 
 # Обновить меню
@@ -99,10 +267,11 @@ async def create_menu(
 async def update_current_menu(
     menu_id: str,
     menu: MenuSchema,
-    db: Session = Depends(get_db)
-) -> models.Menu:
+    response: Response,
+    db: Session = Depends(get_write_db)
+) -> dict[str, Any] | Response:
     menu_to_update = await put_menu(menu_id, menu, db)
-    return menu_to_update
+    return serialized(menu_to_update, response, UpdateMenu)
 
 
 # Удалить меню
@@ -111,7 +280,7 @@ async def update_current_menu(
     summary='Удалить меню',
     response_description='Удалить уже имеющееся в базе данных меню'
 )
-async def delete_current_menu(menu_id: str, db: Session = Depends(get_db)):
+async def delete_current_menu(menu_id: str, db: Session = Depends(get_write_db)):
     await delete_menu(menu_id, db)
 
 
@@ -121,14 +290,34 @@ async def delete_current_menu(menu_id: str, db: Session = Depends(get_db)):
     response_model=list[SubmenuSchema2],
     status_code=status.HTTP_200_OK,
     summary='Получить список подменю',
-    response_description='Получить список всех подменю'
+    response_description=(
+        'Список подменю; с limit или cursor - страница, курсор '
+        'следующей страницы в заголовке X-Next-Cursor'
+    )
 )
 async def all_submenus(
-    api_test_menu_id: UUID4,
-    db: Session = Depends(get_db)
-) -> list[models.Submenu]:
-    submenus = await get_list_submenu(api_test_menu_id, db)
-    return submenus
+    api_test_menu_id: EntityUUID,
+    request: Request,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db)
+) -> list[SubmenuRecord] | Response:
+    submenus, next_cursor = await get_list_submenu(
+        api_test_menu_id,
+        page_limit(limit, cursor),
+        cursor,
+        db
+    )
+    not_modified = check_etag(
+        request,
+        response,
+        version_etag(submenus, next_cursor)
+    )
+    if not_modified is not None:
+        return not_modified
+    set_next_cursor(response, next_cursor)
+    return serialized(submenus, response, SubmenuSchema2, many=True)
 
 
 # Просмотр определенного подменю
@@ -142,11 +331,25 @@ async def all_submenus(
     )
 )
 async def get_target_submenu(
-    api_test_submenu_id: UUID4,
-    db: Session = Depends(get_db)
-) -> models.Submenu:
-    current_submenu = await get_submenu_by_id(api_test_submenu_id, db)
-    return current_submenu
+    api_test_menu_id: EntityUUID,
+    api_test_submenu_id: EntityUUID,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
+) -> models.Submenu | Response:
+    current_submenu = await get_submenu_by_id(
+        api_test_menu_id,
+        api_test_submenu_id,
+        db
+    )
+    not_modified = check_etag(
+        request,
+        response,
+        version_etag([current_submenu])
+    )
+    if not_modified is not None:
+        return not_modified
+    return serialized(current_submenu, response, SubmenuSchemaWithID)
 
 
 # Создать подменю
@@ -163,10 +366,16 @@ async def get_target_submenu(
 async def create_submenu(
     target_menu_id: str,
     submenu: SubmenuSchema,
-    db: Session = Depends(get_db)
-) -> models.Submenu:
+    response: Response,
+    db: Session = Depends(get_write_db)
+) -> dict[str, Any] | Response:
     current_menu = await create_submenu_func(target_menu_id, submenu, db)
-    return current_menu
+    return serialized(
+        current_menu,
+        response,
+        CreateSubMenu,
+        status_code=status.HTTP_201_CREATED
+    )
 
 
 # Обновить подменю
@@ -183,15 +392,16 @@ async def update_current_submenu(
     api_test_menu_id: str,
     api_test_submenu_id: str,
     submenu_update: SubmenuSchema,
-    db: Session = Depends(get_db)
-) -> models.Submenu:
+    response: Response,
+    db: Session = Depends(get_write_db)
+) -> dict[str, Any] | Response:
     current_submenu = await put_submenu(
         api_test_menu_id,
         api_test_submenu_id,
         submenu_update,
         db
     )
-    return current_submenu
+    return serialized(current_submenu, response, UpdateSubmenu)
 
 
 # Удалить подменю
@@ -203,7 +413,7 @@ async def update_current_submenu(
 async def delete_current_submenu(
     api_test_menu_id: str,
     api_test_submenu_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_write_db)
 ):
     await delete_submenu(api_test_menu_id, api_test_submenu_id, db)
 
@@ -214,14 +424,36 @@ async def delete_current_submenu(
     response_model=list[DishesReturn],
     status_code=status.HTTP_200_OK,
     summary='Получить список блюд',
-    response_description='Список блюд для конкретного подменю (по id)'
+    response_description=(
+        'Список блюд для конкретного подменю (по id); с limit или '
+        'cursor - страница, курсор следующей в заголовке X-Next-Cursor'
+    )
 )
 async def get_dishes(
+    menu_id: UUID,
     submenu_id: UUID,
-    db: Session = Depends(get_db)
-) -> models.Dish:
-    dishes_list = await get_list_dish(submenu_id, db)
-    return dishes_list
+    request: Request,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db)
+) -> list[DishRecord] | Response:
+    dishes_list, next_cursor = await get_list_dish(
+        menu_id,
+        submenu_id,
+        page_limit(limit, cursor),
+        cursor,
+        db
+    )
+    not_modified = check_etag(
+        request,
+        response,
+        version_etag(dishes_list, next_cursor)
+    )
+    if not_modified is not None:
+        return not_modified
+    set_next_cursor(response, next_cursor)
+    return serialized(dishes_list, response, DishesReturn, many=True)
 
 
 # Посмотреть определённое блюдо
@@ -235,11 +467,18 @@ async def get_dishes(
     )
 )
 async def receive_current_dish(
+    menu_id: str,
+    submenu_id: str,
     dish_id: str,
-    db: Session = Depends(get_db)
-) -> models.Dish:
-    current_dish = await get_dish_by_id(dish_id, db)
-    return current_dish
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
+) -> models.Dish | Response:
+    current_dish = await get_dish_by_id(menu_id, submenu_id, dish_id, db)
+    not_modified = check_etag(request, response, version_etag([current_dish]))
+    if not_modified is not None:
+        return not_modified
+    return serialized(current_dish, response, DishesWithID)
 
 
 # Создать блюдо
@@ -257,15 +496,21 @@ async def create_dish(
     api_test_menu_id: str,
     api_test_submenu_id: str,
     dish: DishSchema,
-    db: Session = Depends(get_db)
-) -> models.Dish:
+    response: Response,
+    db: Session = Depends(get_write_db)
+) -> dict[str, Any] | Response:
     current_dish = await create_dish_func(
         api_test_menu_id,
         api_test_submenu_id,
         dish,
         db
     )
-    return current_dish
+    return serialized(
+        current_dish,
+        response,
+        CreateDish,
+        status_code=status.HTTP_201_CREATED
+    )
 
 
 # Обновить блюдо
@@ -284,8 +529,9 @@ async def update_current_menu_dish(
     api_test_submenu_id: str,
     api_test_dish_id: str,
     dish_update: DishSchema,
-    db: Session = Depends(get_db)
-) -> models.Dish:
+    response: Response,
+    db: Session = Depends(get_write_db)
+) -> dict[str, Any] | Response:
     dish_to_update = await put_dish(
         api_test_menu_id,
         api_test_submenu_id,
@@ -293,7 +539,7 @@ async def update_current_menu_dish(
         dish_update,
         db
     )
-    return dish_to_update
+    return serialized(dish_to_update, response, UpdateDishes)
 
 
 # Удалить блюдо
@@ -307,7 +553,7 @@ async def delete_current_dish(
     api_test_menu_id: str,
     api_test_submenu_id: str,
     api_test_dish_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_write_db)
 ):
     await delete_dish(
         api_test_menu_id,
@@ -317,9 +563,73 @@ async def delete_current_dish(
     )
 
 
-@router.get('/menus-with-submenus-and-dishes/')
+@router.get(
+    '/menus-with-submenus-and-dishes/',
+    summary='Получить все меню с подменю и блюдами',
+    response_description=(
+        'Дерево всех меню: меню -> подменю -> блюда'
+    )
+)
 async def get_all_menus_with_submenus_and_dishes(
-    db: Session = Depends(get_db)
-):
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
+) -> Response:
+    # В дереве нет колонки version, ETag считается по готовому JSON
     menus = await get_all_menus_with_submenus_and_dishes_func(db)
-    return menus
+    not_modified = check_etag(request, response, strong_etag(menus))
+    if not_modified is not None:
+        return not_modified
+    return Response(
+        content=menus,
+        media_type='application/json',
+        headers=forwarded_headers(response)
+    )
+
+
+@router.get(
+    '/menus-with-submenus-and-dishes/export',
+    summary='Выгрузить все меню с подменю и блюдами (NDJSON)',
+    response_description=(
+        'Поток NDJSON: одна строка на меню '
+        'с вложенными подменю и блюдами'
+    )
+)
+async def export_all_menus_with_submenus_and_dishes(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
+) -> Response:
+    # Выгрузка не кэшируется и не собирается целиком: ETag считается
+    # по поколению тега 'tree', которое меняет любая запись в меню
+    generation = await tag_generations(
+        get_all_menus_with_submenus_and_dishes_func, (), {}
+    )
+    not_modified = check_etag(
+        request,
+        response,
+        strong_etag('tree', generation, 'ndjson')
+    )
+    if not_modified is not None:
+        return not_modified
+    return StreamingResponse(
+        stream_all_menus_with_submenus_and_dishes(db),
+        media_type='application/x-ndjson',
+        headers=forwarded_headers(response)
+    )
+
+
+@router.get(
+    '/metrics/db-pool',
+    tags=['Metrics'],
+    summary='Метрики пула соединений с БД',
+    response_description=(
+        'Размер и занятость пулов основного сервера и реплики, '
+        'время ожидания соединения в этом воркере'
+    )
+)
+async def get_db_pool_metrics() -> dict[str, Any]:
+    return {
+        'primary': pool_metrics.snapshot(engine.pool),
+        'replica': read_pool_metrics.snapshot(read_engine.pool),
+    }
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, update
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.expression import ColumnElement, Update
 
 from api.data.database import Base
 
@@ -13,45 +14,69 @@ class Menu(Base):
     description = Column(String, nullable=True, unique=False)
     submenus_count = Column(Integer, default=0)
     dishes_count = Column(Integer, default=0)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
     submenus = relationship('Submenu', back_populates='menu_items')
 
-    def add_submenu_count(self, value: int):
-        self.submenus_count += value
-
-    def add_dishes_count(self, value: int):
-        self.dishes_count += value
-
-    def delete_submenu_count(self, value: int):
-        self.submenus_count -= value
-
-    def delete_dishes_count(self, value: int):
-        self.dishes_count -= value
+    @classmethod
+    def change_counts(
+        cls,
+        menu_id: str | ColumnElement,
+        submenus: int | ColumnElement = 0,
+        dishes: int | ColumnElement = 0
+    ) -> Update:
+        # Счётчики меняются в самом UPDATE, без чтения строки в Python.
+        # menu_id может ссылаться на CTE: тогда это UPDATE ... FROM
+        return (
+            update(cls)
+            .where(cls.id == menu_id)
+            .values(
+                submenus_count=cls.submenus_count + submenus,
+                dishes_count=cls.dishes_count + dishes,
+                version=cls.version + 1
+            )
+            .returning(*cls.__table__.c)
+        )
 
 
 class Submenu(Base):
     __tablename__ = 'Submenu'
+    # Поиск по меню, каскадное удаление и keyset-пагинация по id
+    __table_args__ = (Index('ix_Submenu_menu_id_id', 'menu_id', 'id'),)
 
     id = Column(UUID(as_uuid=True), primary_key=True)
     title = Column(String, nullable=False, unique=True)
     description = Column(String, nullable=True, unique=False)
     dishes_count = Column(Integer, default=0)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
     menu_id = Column(UUID, ForeignKey(Menu.id, ondelete='CASCADE'))
     menu_items = relationship('Menu', back_populates='submenus')
     dishes = relationship('Dish', back_populates='submenu_items')
 
-    def update_dishes_count(self, value: int):
-        self.dishes_count += value
-
-    def delete_dishes_count(self, value: int):
-        self.dishes_count -= value
+    @classmethod
+    def change_dishes_count(
+        cls,
+        submenu_id: str | ColumnElement,
+        dishes: int
+    ) -> Update:
+        return (
+            update(cls)
+            .where(cls.id == submenu_id)
+            .values(
+                dishes_count=cls.dishes_count + dishes,
+                version=cls.version + 1
+            )
+            .returning(*cls.__table__.c)
+        )
 
 
 class Dish(Base):
     __tablename__ = 'Dish'
+    __table_args__ = (Index('ix_Dish_submenu_id_id', 'submenu_id', 'id'),)
 
     id = Column(UUID(as_uuid=True), primary_key=True)
     title = Column(String, nullable=False, unique=True)
     description = Column(String, nullable=True, unique=False)
     price = Column(String)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
     submenu_id = Column(UUID, ForeignKey(Submenu.id, ondelete='CASCADE'))
     submenu_items = relationship('Submenu', back_populates='dishes')
@@ -0,0 +1,58 @@
+from collections.abc import Iterable
+from dataclasses import dataclass, fields
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy.future import select
+from sqlalchemy.sql import Select
+
+from api.models.models import Dish, Menu, Submenu
+
+
+# Записи для списков: только нужные колонки, без ORM и identity map.
+# Поля совпадают с именами колонок модели; version нужна для ETag.
+class Record:
+    __slots__ = ()
+    __model__: Any
+
+    @classmethod
+    def select(cls) -> Select:
+        return select(*(getattr(cls.__model__, f.name) for f in fields(cls)))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> list[Any]:
+        return [cls(*row) for row in rows]
+
+
+@dataclass(slots=True, frozen=True)
+class MenuRecord(Record):
+    __model__ = Menu
+
+    id: UUID
+    title: str
+    description: str | None
+    submenus_count: int
+    dishes_count: int
+    version: int
+
+
+@dataclass(slots=True, frozen=True)
+class SubmenuRecord(Record):
+    __model__ = Submenu
+
+    id: UUID
+    title: str
+    description: str | None
+    dishes_count: int
+    version: int
+
+
+@dataclass(slots=True, frozen=True)
+class DishRecord(Record):
+    __model__ = Dish
+
+    id: UUID
+    title: str
+    description: str | None
+    price: str
+    version: int
@@ -1,4 +1,19 @@
-from pydantic import UUID4, BaseModel
+from functools import cache
+from typing import Annotated, Any
+from uuid import UUID
+
+import orjson
+from pydantic import AfterValidator, BaseModel
+
+
+def check_uuid_version(value: UUID) -> UUID:
+    # Старые записи имеют id версии 4, новые - версии 7 (api.data.ids)
+    if value.version not in (4, 7):
+        raise ValueError('UUID version 4 or 7 expected')
+    return value
+
+
+EntityUUID = Annotated[UUID, AfterValidator(check_uuid_version)]
 
 
 class MenuSchema(BaseModel):
@@ -12,7 +27,7 @@ class MenuSchema(BaseModel):
 
 
 class MenuSchemaWithID(MenuSchema):
-    id: UUID4
+    id: EntityUUID
 
 
 class CreateMenu(MenuSchemaWithID):
@@ -40,12 +55,12 @@ class SubmenuSchema2(BaseModel):
 
 
 class SubmenuSchemaWithID(SubmenuSchema2):
-    id: UUID4
-    menu_id: UUID4
+    id: EntityUUID
+    menu_id: EntityUUID
 
 
 class CreateSubMenu(SubmenuSchema2):
-    id: UUID4
+    id: EntityUUID
 
 
 class UpdateSubmenu(BaseModel):
@@ -64,7 +79,7 @@ class DishSchema(BaseModel):
 
 
 class DishesReturn(BaseModel):
-    id: UUID4
+    id: EntityUUID
     title: str
     description: str | None
     price: str
@@ -74,12 +89,12 @@ class DishesReturn(BaseModel):
 
 
 class DishesWithID(DishesReturn):
-    id: UUID4
-    submenu_id: UUID4
+    id: EntityUUID
+    submenu_id: EntityUUID
 
 
 class CreateDish(BaseModel):
-    id: UUID4
+    id: EntityUUID
     price: str
     title: str
     description: str
@@ -89,10 +104,43 @@ class CreateDish(BaseModel):
 
 
 class UpdateDishes(BaseModel):
-    id: UUID4
+    id: EntityUUID
     price: str
     title: str
     description: str
 
     class Config:
         from_attributes = True
+
+
+class JsonSerializer:
+    """
+    Сериализатор ответа, собранный один раз на схему. Берёт из объекта
+    (dict из кэша или RETURNING, запись, ORM-объект) только поля схемы
+    и кодирует их orjson без повторной валидации: данные пришли из нашей
+    БД или кэша и уже соответствуют схеме.
+    """
+
+    def __init__(self, schema: type[BaseModel], many: bool = False) -> None:
+        self.many = many
+        self.defaults = tuple(
+            (name, None if field.is_required() else field.default)
+            for name, field in schema.model_fields.items()
+        )
+
+    def _pick(self, item: Any) -> dict[str, Any]:
+        if isinstance(item, dict):
+            return {name: item.get(name, default)
+                    for name, default in self.defaults}
+        return {name: getattr(item, name, default)
+                for name, default in self.defaults}
+
+    def dumps(self, content: Any) -> bytes:
+        if self.many:
+            return orjson.dumps([self._pick(item) for item in content])
+        return orjson.dumps(self._pick(content))
+
+
+@cache
+def serializer_for(schema: type[BaseModel], many: bool = False) -> JsonSerializer:
+    return JsonSerializer(schema, many)
@@ -0,0 +1,207 @@
+from collections.abc import Iterable, Mapping, Sequence
+from typing import Any
+
+from sqlalchemy import func, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql.expression import ColumnElement, Insert
+
+from api.cache.invalidation import invalidate_bulk_upsert
+from api.config.config import XLSX_SYNC_BATCH_SIZE
+from api.data.database import Base
+from api.models.models import Dish, Menu, Submenu
+
+# Поля, которые пакетная запись перезаписывает у существующих строк
+MENU_FIELDS = ('title', 'description')
+SUBMENU_FIELDS = ('title', 'description', 'menu_id')
+DISH_FIELDS = ('title', 'description', 'price', 'submenu_id')
+
+
+# INSERT ... ON CONFLICT DO UPDATE для пачки строк. Строки без изменений
+# не перезаписываются и не попадают в RETURNING
+def upsert_statement(
+    model: type[Base],
+    rows: Sequence[dict[str, Any]],
+    fields: Sequence[str],
+    parent: ColumnElement | None = None
+) -> Insert:
+    stmt = insert(model).values(list(rows))
+    current = tuple_(*(getattr(model, field) for field in fields))
+    incoming = tuple_(*(stmt.excluded[field] for field in fields))
+    returning = [model.id] if parent is None else [model.id, parent]
+    return (
+        stmt.on_conflict_do_update(
+            index_elements=[model.id],
+            set_={
+                **{field: stmt.excluded[field] for field in fields},
+                'version': model.version + 1,
+            },
+            where=current.is_distinct_from(incoming),
+        )
+        .returning(*returning)
+    )
+
+
+# Записать строки пачками по XLSX_SYNC_BATCH_SIZE (у Postgres есть
+# предел числа параметров запроса); вернуть id изменённых строк
+# и их родителей
+async def upsert_rows(
+    db: AsyncSession,
+    model: type[Base],
+    rows: Sequence[dict[str, Any]],
+    fields: Sequence[str],
+    parent: ColumnElement | None = None
+) -> dict[str, str | None]:
+    changed: dict[str, str | None] = {}
+    for start in range(0, len(rows), XLSX_SYNC_BATCH_SIZE):
+        batch = rows[start:start + XLSX_SYNC_BATCH_SIZE]
+        result = await db.execute(
+            upsert_statement(model, batch, fields, parent)
+        )
+        for row in result:
+            changed[str(row[0])] = str(row[1]) if parent is not None else None
+    return changed
+
+
+# id родителей изменённых строк (у меню родителя нет)
+def changed_parents(changed: dict[str, str | None]) -> set[str]:
+    return {parent for parent in changed.values() if parent is not None}
+
+
+# Текущие родители строк до записи: перенос строки меняет
+# счётчики и старого родителя
+async def current_parents(
+    db: AsyncSession,
+    column: ColumnElement,
+    parent: ColumnElement,
+    ids: Iterable[str]
+) -> dict[str, str]:
+    ids = list(ids)
+    if not ids:
+        return {}
+    result = await db.execute(select(column, parent).where(column.in_(ids)))
+    return {str(row_id): str(value) for row_id, value in result}
+
+
+# Родители, из которых изменённые строки перенесены в другого родителя
+def left_parents(
+    changed: Mapping[str, str | None],
+    old: Mapping[str, str]
+) -> set[str]:
+    return {
+        old[row_id] for row_id, parent in changed.items()
+        if row_id in old and old[row_id] != parent
+    }
+
+
+# Родители, у которых изменился состав детей (вставка или перенос).
+# Правка полей строки без переноса счётчики не меняет
+def regrouped_parents(
+    changed: Mapping[str, str | None],
+    old: Mapping[str, str]
+) -> set[str]:
+    return left_parents(changed, old) | {
+        parent for row_id, parent in changed.items()
+        if parent is not None and old.get(row_id) != parent
+    }
+
+
+# Пересчитать счётчики подменю и меню по фактическим строкам,
+# по одному UPDATE на таблицу; вернуть id меню, затронутых пересчётом
+async def recount(
+    db: AsyncSession,
+    submenu_ids: set[str],
+    menu_ids: set[str]
+) -> set[str]:
+    menu_ids = set(menu_ids)
+    if submenu_ids:
+        result = await db.execute(
+            update(Submenu)
+            .where(Submenu.id.in_(submenu_ids))
+            .values(
+                dishes_count=select(func.count())
+                .where(Dish.submenu_id == Submenu.id)
+                .scalar_subquery(),
+                version=Submenu.version + 1
+            )
+            .returning(Submenu.menu_id)
+        )
+        menu_ids.update(str(menu_id) for menu_id in result.scalars())
+    if menu_ids:
+        await db.execute(
+            update(Menu)
+            .where(Menu.id.in_(menu_ids))
+            .values(
+                submenus_count=select(func.count())
+                .where(Submenu.menu_id == Menu.id)
+                .scalar_subquery(),
+                dishes_count=select(
+                    func.coalesce(func.sum(Submenu.dishes_count), 0)
+                )
+                .where(Submenu.menu_id == Menu.id)
+                .scalar_subquery(),
+                version=Menu.version + 1
+            )
+        )
+    return menu_ids
+
+
+async def upsert_menu_tree(
+    db: AsyncSession,
+    menus: Sequence[dict[str, Any]],
+    submenus: Sequence[dict[str, Any]],
+    dishes: Sequence[dict[str, Any]]
+) -> dict[str, int]:
+    """
+    Записать меню, подменю и блюда напрямую в БД одной транзакцией.
+    Каждая сущность пишется пачками INSERT ... ON CONFLICT DO UPDATE
+    (родители раньше детей), счётчики родителей, у которых появились
+    или ушли дети, пересчитываются один раз в конце, после фиксации
+    сбрасываются только теги кэша затронутых строк и их родителей.
+    Если ничего не изменилось, кэш не сбрасывается.
+    Параметры:
+    - db: AsyncSession - Асинхронная сессия основного сервера БД.
+    - menus: строки меню (id, title, description).
+    - submenus: строки подменю (id, title, description, menu_id).
+    - dishes: строки блюд (id, title, description, price, submenu_id).
+    Возвращает:
+    - dict[str, int]: Число изменённых меню, подменю и блюд.
+    """
+
+    async with db.begin():
+        old_menus = await current_parents(
+            db, Submenu.id, Submenu.menu_id, (row['id'] for row in submenus)
+        )
+        old_submenus = await current_parents(
+            db, Dish.id, Dish.submenu_id, (row['id'] for row in dishes)
+        )
+        changed_menus = await upsert_rows(db, Menu, menus, MENU_FIELDS)
+        changed_submenus = await upsert_rows(
+            db, Submenu, submenus, SUBMENU_FIELDS, Submenu.menu_id
+        )
+        changed_dishes = await upsert_rows(
+            db, Dish, dishes, DISH_FIELDS, Dish.submenu_id
+        )
+
+        recounted_submenus = regrouped_parents(changed_dishes, old_submenus)
+        recounted_menus = await recount(
+            db,
+            recounted_submenus,
+            regrouped_parents(changed_submenus, old_menus)
+        )
+
+    await invalidate_bulk_upsert(
+        menu_ids=recounted_menus | changed_menus.keys(),
+        submenu_ids=recounted_submenus | changed_submenus.keys(),
+        dish_ids=changed_dishes,
+        submenu_lists=recounted_menus | changed_parents(changed_submenus),
+        dish_lists=recounted_submenus | changed_parents(changed_dishes),
+        left_menus=left_parents(changed_submenus, old_menus),
+        left_submenus=left_parents(changed_dishes, old_submenus)
+    )
+    return {
+        'menus': len(changed_menus),
+        'submenus': len(changed_submenus),
+        'dishes': len(changed_dishes),
+    }
@@ -1,6 +1,14 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Sequence
+from typing import Any, overload
+from uuid import UUID
+
 from fastapi import HTTPException
+from sqlalchemy import JSON, and_, exists, func, literal_column, type_coerce
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.sql.expression import CTE, ColumnElement
 
 from api.models.models import Dish, Menu, Submenu
 
@@ -17,34 +25,197 @@ async def get_menu_or_404(menu_id: str, db: AsyncSession) -> Menu:
     return current_menu
 
 
-# Получить подменю или ошибку 404
-async def get_submenu_or_404(
-    api_test_submenu_id: str | None,
-    db: AsyncSession
-) -> Submenu:
-
-    if api_test_submenu_id == 'null':
-        api_test_submenu_id = None
-
-    stmt = select(Submenu).where(Submenu.id == api_test_submenu_id)
+def _parse_id(value: str | UUID | None, name: str) -> UUID:
+    # Некорректный id в пути - тоже «не найдено», а не ошибка БД
+    try:
+        return value if isinstance(value, UUID) else UUID(str(value))
+    except ValueError:
+        raise HTTPException(status_code=404, detail=f'{name} not found')
+
+
+# Условие «подменю принадлежит меню» для запросов к блюдам
+def submenu_in_menu(submenu_id: str, menu_id: str) -> ColumnElement:
+    return exists().where(and_(
+        Submenu.id == submenu_id,
+        Submenu.menu_id == menu_id
+    ))
+
+
+@overload
+async def get_path_or_404(
+    db: AsyncSession,
+    menu_id: str | UUID
+) -> tuple[Menu, None, None]:
+    ...
+
+
+@overload
+async def get_path_or_404(
+    db: AsyncSession,
+    menu_id: str | UUID,
+    submenu_id: str | UUID
+) -> tuple[Menu, Submenu, None]:
+    ...
+
+
+@overload
+async def get_path_or_404(
+    db: AsyncSession,
+    menu_id: str | UUID,
+    submenu_id: str | UUID,
+    dish_id: str | UUID
+) -> tuple[Menu, Submenu, Dish]:
+    ...
+
+
+@overload
+async def get_path_or_404(
+    db: AsyncSession,
+    menu_id: str | UUID,
+    submenu_id: str | UUID | None = None,
+    dish_id: str | UUID | None = None
+) -> tuple[Menu, Submenu | None, Dish | None]:
+    ...
+
+
+# Проверить путь меню/подменю/блюдо одним запросом или вернуть ошибку 404
+async def get_path_or_404(
+    db: AsyncSession,
+    menu_id: str | UUID,
+    submenu_id: str | UUID | None = None,
+    dish_id: str | UUID | None = None
+) -> tuple[Menu, Submenu | None, Dish | None]:
+    """
+    Найти меню, его подменю и блюдо этого подменю одним запросом
+    с внешними соединениями. Подменю из другого меню или блюдо из
+    другого подменю считаются ненайденными.
+
+    Возвращает:
+    - (меню, подменю, блюдо); не запрошенные части пути - None.
+    - Иначе HTTPException 404 с первой ненайденной частью пути.
+    """
+
+    menu_uuid = _parse_id(menu_id, 'menu')
+    entities: list[Any] = [Menu]
+    joined = Menu.__table__
+    # Блюдо ищется только внутри подменю
+    if submenu_id is not None or dish_id is not None:
+        entities.append(Submenu)
+        joined = joined.outerjoin(Submenu, and_(
+            Submenu.menu_id == Menu.id,
+            Submenu.id == _parse_id(submenu_id, 'submenu')
+        ))
+    if dish_id is not None:
+        entities.append(Dish)
+        joined = joined.outerjoin(Dish, and_(
+            Dish.submenu_id == Submenu.id,
+            Dish.id == _parse_id(dish_id, 'dish')
+        ))
+
+    stmt = (
+        select(*entities)
+        .select_from(joined)
+        .where(Menu.id == menu_uuid)
+    )
     result = await db.execute(stmt)
-    current_submenu = result.scalar()
+    row = result.first()
 
-    if current_submenu is None:
+    if row is None:
+        raise HTTPException(status_code=404, detail='menu not found')
+    menu, submenu, dish = (*row, None, None)[:3]
+    if submenu_id is not None and submenu is None:
         raise HTTPException(status_code=404, detail='submenu not found')
+    if dish_id is not None and dish is None:
+        raise HTTPException(status_code=404, detail='dish not found')
 
-    return current_submenu
-
+    return menu, submenu, dish
 
-# Получить блюдо или ошибку 404
-async def get_dish_or_404(dish_id: str, db: AsyncSession) -> Dish:
 
-    current_dish = select(Dish).where(
-        Dish.id == dish_id)
-    result = await db.execute(current_dish)
-    current_dish = result.scalar()
+# JSON строки, которую вернуло CTE с RETURNING (None, если строк нет)
+def returned_row(cte: CTE) -> ColumnElement:
+    return type_coerce(
+        select(func.row_to_json(literal_column(cte.name)))
+        .select_from(cte)
+        .scalar_subquery(),
+        JSON
+    )
 
-    if current_dish is None:
-        raise HTTPException(status_code=404, detail='dish not found')
 
-    return current_dish
+# Выполнить запись одним запросом и получить строки, возвращённые её CTE
+async def execute_write(
+    db: AsyncSession,
+    **returning: CTE
+) -> dict[str, dict[str, Any] | None]:
+    stmt = select(*(
+        returned_row(cte).label(name) for name, cte in returning.items()
+    ))
+    result = await db.execute(stmt)
+    return dict(result.one()._mapping)
+
+
+# Ошибка 404 для первой сущности, которую запись не нашла
+def raise_if_missing(
+    rows: dict[str, dict[str, Any] | None],
+    *names: str
+) -> None:
+    for name in names:
+        require_row(rows, name)
+
+
+# Строка записи или 404, если её нет; тип сужается до dict
+def require_row(
+    rows: dict[str, dict[str, Any] | None],
+    name: str
+) -> dict[str, Any]:
+    row = rows[name]
+    if row is None:
+        raise HTTPException(status_code=404, detail=f'{name} not found')
+    return row
+
+
+# Ошибка 404 с точной причиной, если запись не нашла часть пути
+async def raise_if_path_missing(
+    rows: dict[str, dict[str, Any] | None],
+    db: AsyncSession,
+    menu_id: str,
+    submenu_id: str | None = None,
+    dish_id: str | None = None
+) -> None:
+    if all(row is not None for row in rows.values()):
+        return
+    # Дополнительный запрос только на пути ошибки
+    await get_path_or_404(db, menu_id, submenu_id, dish_id)
+    # Путь существует - строку успел удалить конкурентный запрос
+    raise_if_missing(rows, *rows)
+
+
+# Закодировать id последней записи страницы в непрозрачный курсор
+def encode_cursor(last_id: UUID | str) -> str:
+    return urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+# Раскодировать курсор обратно в id или вернуть ошибку 400
+def decode_cursor(cursor: str) -> UUID:
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        return UUID(urlsafe_b64decode(cursor + padding).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail='invalid cursor')
+
+
+# Сколько строк выбрать: на одну больше страницы, чтобы узнать
+# о следующей; без limit - весь список
+def fetch_limit(limit: int | None) -> int | None:
+    return None if limit is None else limit + 1
+
+
+# Отрезать страницу из выборки limit + 1 строк и посчитать следующий курсор
+def paginate(
+    rows: Sequence[Any],
+    limit: int | None
+) -> tuple[list[Any], str | None]:
+    if limit is None:
+        return list(rows), None
+    page = list(rows[:limit])
+    next_cursor = encode_cursor(page[-1].id) if len(rows) > limit else None
+    return page, next_cursor
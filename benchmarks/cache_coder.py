@@ -0,0 +1,102 @@
+"""
+Бенчмарк кодеков кэша на синтетическом каталоге.
+
+Сравнивает JsonCoder из fastapi-cache и OrjsonCoder проекта:
+время encode/decode и размер значения для дерева меню
+(готовая JSON-строка из Postgres) и для страницы списка блюд.
+С флагом --redis дополнительно пишет значения в Redis
+и выводит MEMORY USAGE каждого ключа.
+
+Запуск: python -m benchmarks.cache_coder [--menus 50] [--redis]
+"""
+import argparse
+import json
+import timeit
+import uuid
+
+from fastapi_cache.coder import JsonCoder
+
+from api.cache.coder import OrjsonCoder
+
+
+def build_catalogue(menus: int, submenus: int, dishes: int) -> list[dict]:
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'title': f'Menu {m}',
+            'description': f'Description of menu {m}',
+            'submenus_count': submenus,
+            'dishes_count': submenus * dishes,
+            'submenus': [
+                {
+                    'id': str(uuid.uuid4()),
+                    'title': f'Submenu {m}.{s}',
+                    'description': f'Description of submenu {m}.{s}',
+                    'dishes_count': dishes,
+                    'dishes': [
+                        {
+                            'id': str(uuid.uuid4()),
+                            'title': f'Dish {m}.{s}.{d}',
+                            'description': f'Description of dish {m}.{s}.{d}',
+                            'price': f'{d}.99',
+                        }
+                        for d in range(dishes)
+                    ],
+                }
+                for s in range(submenus)
+            ],
+        }
+        for m in range(menus)
+    ]
+
+
+def measure(coder, value, number: int) -> tuple[float, float, int]:
+    encoded = coder.encode(value)
+    encode_time = timeit.timeit(lambda: coder.encode(value), number=number)
+    decode_time = timeit.timeit(lambda: coder.decode(encoded), number=number)
+    return encode_time / number, decode_time / number, len(encoded)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--menus', type=int, default=50)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=20)
+    parser.add_argument('--number', type=int, default=20)
+    parser.add_argument('--redis', action='store_true')
+    options = parser.parse_args()
+
+    catalogue = build_catalogue(options.menus, options.submenus, options.dishes)
+    dishes = catalogue[0]['submenus'][0]['dishes']
+    values = {
+        'tree': json.dumps(catalogue),
+        'dish_page': [dishes, None],
+    }
+    coders = {'JsonCoder': JsonCoder, 'OrjsonCoder': OrjsonCoder}
+
+    print(f'{"value":<10} {"coder":<12} {"encode, ms":>11} {"decode, ms":>11} {"bytes":>10}')
+    for value_name, value in values.items():
+        for coder_name, coder in coders.items():
+            encode, decode, size = measure(coder, value, options.number)
+            print(
+                f'{value_name:<10} {coder_name:<12} '
+                f'{encode * 1000:>11.3f} {decode * 1000:>11.3f} {size:>10}'
+            )
+
+    if options.redis:
+        from redis import Redis
+
+        from api.cache.backend import to_redis
+        from api.config.config import REDIS_DB, REDIS_HOST, REDIS_PORT
+
+        redis = Redis(host=REDIS_HOST, port=int(REDIS_PORT), db=int(REDIS_DB))
+        for value_name, value in values.items():
+            for coder_name, coder in coders.items():
+                key = f'benchmark:{value_name}:{coder_name}'
+                redis.set(key, to_redis(coder.encode(value)))
+                print(f'{key}: MEMORY USAGE {redis.memory_usage(key)} bytes')
+                redis.delete(key)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Бенчмарк чтения списка блюд: ORM-объекты против записей DishRecord.
+
+Внутри транзакции (в конце откатывается) создаёт меню, подменю
+и --rows блюд, затем читает весь список двумя способами:
+select(Dish) с identity map и DishRecord.select() с записями
+на __slots__. Выводит среднее время чтения, время вместе
+с проверкой схемой ответа и пик памяти (tracemalloc) на одно чтение.
+Нужен запущенный Postgres из настроек проекта.
+
+Запуск: python -m benchmarks.read_models [--rows 10000] [--number 20]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from api.data.database import engine
+from api.data.ids import uuid7
+from api.models.models import Dish, Menu, Submenu
+from api.models.records import DishRecord
+from api.schemas.schemas import DishesReturn
+
+response_adapter = TypeAdapter(list[DishesReturn])
+
+
+async def read_orm(db: AsyncSession, submenu_id: str) -> list[Any]:
+    db.expunge_all()
+    result = await db.execute(
+        select(Dish).where(Dish.submenu_id == submenu_id).order_by(Dish.id)
+    )
+    return result.scalars().all()
+
+
+async def read_records(db: AsyncSession, submenu_id: str) -> list[Any]:
+    result = await db.execute(
+        DishRecord.select()
+        .where(Dish.submenu_id == submenu_id)
+        .order_by(Dish.id)
+    )
+    return DishRecord.from_rows(result)
+
+
+async def seed(db: AsyncSession, rows: int) -> str:
+    menu_id, submenu_id = uuid7(), uuid7()
+    await db.execute(insert(Menu).values(
+        id=menu_id, title=f'Benchmark menu {menu_id}', description='')
+    )
+    await db.execute(insert(Submenu).values(
+        id=submenu_id, title=f'Benchmark submenu {submenu_id}',
+        description='', menu_id=str(menu_id))
+    )
+    await db.execute(insert(Dish), [
+        {
+            'id': uuid7(),
+            'title': f'Benchmark dish {submenu_id} {number}',
+            'description': f'Description of dish {number}',
+            'price': f'{number % 100}.99',
+            'submenu_id': str(submenu_id),
+        }
+        for number in range(rows)
+    ])
+    return str(submenu_id)
+
+
+async def measure(
+    read: Callable[[AsyncSession, str], Awaitable[list[Any]]],
+    db: AsyncSession,
+    submenu_id: str,
+    number: int
+) -> tuple[float, float, int]:
+    await read(db, submenu_id)
+
+    started = time.perf_counter()
+    for _ in range(number):
+        await read(db, submenu_id)
+    fetch = (time.perf_counter() - started) / number
+
+    started = time.perf_counter()
+    for _ in range(number):
+        response_adapter.validate_python(
+            await read(db, submenu_id), from_attributes=True
+        )
+    with_response = (time.perf_counter() - started) / number
+
+    tracemalloc.start()
+    page = await read(db, submenu_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del page
+    return fetch, with_response, peak
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--number', type=int, default=20)
+    options = parser.parse_args()
+
+    readers = {'orm': read_orm, 'records': read_records}
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        db = AsyncSession(bind=conn)
+        try:
+            submenu_id = await seed(db, options.rows)
+            print(f'{"read":<8} {"rows":>7} {"fetch, ms":>10} '
+                  f'{"+schema, ms":>12} {"peak, KB":>10}')
+            for name, read in readers.items():
+                fetch, with_response, peak = await measure(
+                    read, db, submenu_id, options.number
+                )
+                print(
+                    f'{name:<8} {options.rows:>7} {fetch * 1000:>10.1f} '
+                    f'{with_response * 1000:>12.1f} {peak / 1024:>10.0f}'
+                )
+        finally:
+            await db.close()
+            await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
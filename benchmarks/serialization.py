@@ -0,0 +1,157 @@
+"""
+Бенчмарк сериализации ответа: список меню и дерево меню.
+
+Список меню (--menus записей MenuRecord, как из БД или кэша) кодируется
+тремя способами: проверка через response_model и стандартный json
+(путь FastAPI по умолчанию), та же проверка с ORJSONResponse
+и готовый сериализатор схемы без повторной валидации.
+Дерево (--menus меню по --submenus подменю по --dishes блюд)
+сравнивается так: разобранное дерево через jsonable_encoder и json,
+через ORJSONResponse и готовая JSON-строка из Postgres/кэша,
+которую маршрут отдаёт как есть. БД не нужна, данные синтетические.
+
+Запуск: python -m benchmarks.serialization [--menus 100] [--number 1000]
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.models.records import MenuRecord
+from api.schemas.schemas import MenuSchema, serializer_for
+
+menu_list_field = create_response_field(
+    name='Response_get_list_menu', type_=list[MenuSchema]
+)
+menu_list_serializer = serializer_for(MenuSchema, many=True)
+
+
+def make_menus(menus: int) -> list[MenuRecord]:
+    return [
+        MenuRecord(
+            id=uuid.uuid4(),
+            title=f'Benchmark menu {number}',
+            description=f'Description of menu {number}',
+            submenus_count=number % 10,
+            dishes_count=number % 100,
+            version=1
+        )
+        for number in range(menus)
+    ]
+
+
+def make_tree(menus: int, submenus: int, dishes: int) -> str:
+    return json.dumps([
+        {
+            'id': str(uuid.uuid4()),
+            'title': f'Benchmark menu {menu}',
+            'description': f'Description of menu {menu}',
+            'submenus_count': submenus,
+            'dishes_count': submenus * dishes,
+            'submenus': [
+                {
+                    'id': str(uuid.uuid4()),
+                    'title': f'Benchmark submenu {submenu}',
+                    'description': f'Description of submenu {submenu}',
+                    'dishes_count': dishes,
+                    'dishes': [
+                        {
+                            'id': str(uuid.uuid4()),
+                            'title': f'Benchmark dish {dish}',
+                            'description': f'Description of dish {dish}',
+                            'price': f'{dish}.99',
+                        }
+                        for dish in range(dishes)
+                    ]
+                }
+                for submenu in range(submenus)
+            ]
+        }
+        for menu in range(menus)
+    ])
+
+
+async def list_response_model(menus: list[MenuRecord]) -> bytes:
+    content = await serialize_response(
+        field=menu_list_field, response_content=menus
+    )
+    return JSONResponse(content).body
+
+
+async def list_response_model_orjson(menus: list[MenuRecord]) -> bytes:
+    content = await serialize_response(
+        field=menu_list_field, response_content=menus
+    )
+    return ORJSONResponse(content).body
+
+
+async def list_precompiled(menus: list[MenuRecord]) -> bytes:
+    return menu_list_serializer.dumps(menus)
+
+
+async def tree_json(tree: str) -> bytes:
+    return JSONResponse(jsonable_encoder(json.loads(tree))).body
+
+
+async def tree_orjson(tree: str) -> bytes:
+    return ORJSONResponse(json.loads(tree)).body
+
+
+async def tree_passthrough(tree: str) -> bytes:
+    return tree.encode()
+
+
+async def measure(
+    encode: Callable[[Any], Awaitable[bytes]],
+    content: Any,
+    number: int
+) -> tuple[float, int]:
+    body = await encode(content)
+    started = time.perf_counter()
+    for _ in range(number):
+        await encode(content)
+    return (time.perf_counter() - started) / number, len(body)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--menus', type=int, default=100)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=10)
+    parser.add_argument('--number', type=int, default=1000)
+    options = parser.parse_args()
+
+    cases = {
+        'menus': (make_menus(options.menus), {
+            'response_model': list_response_model,
+            'response_model+orjson': list_response_model_orjson,
+            'precompiled': list_precompiled,
+        }),
+        'tree': (
+            make_tree(options.menus, options.submenus, options.dishes),
+            {
+                'jsonable_encoder': tree_json,
+                'orjson': tree_orjson,
+                'passthrough': tree_passthrough,
+            }
+        ),
+    }
+    print(f'{"endpoint":<8} {"serializer":<22} {"per request, us":>16} '
+          f'{"body, KB":>9}')
+    for endpoint, (content, encoders) in cases.items():
+        for name, encode in encoders.items():
+            elapsed, size = await measure(encode, content, options.number)
+            print(f'{endpoint:<8} {name:<22} {elapsed * 1_000_000:>16.1f} '
+                  f'{size / 1024:>9.1f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""
+Бенчмарк первичных ключей uuid4 и uuid7 на таблице блюд.
+
+Создаёт две временные копии таблицы "Dish" (с индексами), заливает
+в каждую одинаковое число строк пачками через COPY и выводит время
+вставки, скорость и размер индексов: первичного ключа
+и (submenu_id, id). Нужен запущенный Postgres из настроек проекта.
+
+Запуск: python -m benchmarks.uuid_keys [--rows 1000000] [--batch 10000]
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections.abc import Callable
+
+import asyncpg
+
+from api.data.database import SQLALCHEMY_DATABASE_URL
+from api.data.ids import uuid7
+
+COLUMNS = ('id', 'title', 'description', 'price', 'submenu_id', 'version')
+
+
+async def load(
+    conn: asyncpg.Connection,
+    table: str,
+    make_id: Callable[[], uuid.UUID],
+    rows: int,
+    batch: int,
+    submenus: list[str]
+) -> float:
+    await conn.execute(
+        f'CREATE TEMP TABLE {table} (LIKE "Dish" INCLUDING ALL)'
+    )
+    elapsed = 0.0
+    for start in range(0, rows, batch):
+        records = [
+            (make_id(), f'Dish {number}', 'Benchmark dish', '9.99',
+             random.choice(submenus), 1)
+            for number in range(start, min(start + batch, rows))
+        ]
+        started = time.perf_counter()
+        await conn.copy_records_to_table(
+            table, records=records, columns=COLUMNS
+        )
+        elapsed += time.perf_counter() - started
+    return elapsed
+
+
+async def index_sizes(conn: asyncpg.Connection, table: str) -> list[tuple]:
+    return await conn.fetch(
+        '''
+        SELECT indexrelid::regclass::text AS name,
+               pg_relation_size(indexrelid) AS size
+        FROM pg_index
+        WHERE indrelid = $1::regclass
+        ORDER BY name
+        ''',
+        table
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=10_000)
+    parser.add_argument('--submenus', type=int, default=1000)
+    options = parser.parse_args()
+
+    dsn = SQLALCHEMY_DATABASE_URL.replace('+asyncpg', '')
+    conn = await asyncpg.connect(dsn)
+    submenus = [str(uuid.uuid4()) for _ in range(options.submenus)]
+    generators = {'uuid4': uuid.uuid4, 'uuid7': uuid7}
+    try:
+        print(f'{"ids":<6} {"rows":>9} {"seconds":>9} {"rows/s":>10} '
+              f'{"index":<40} {"size, MB":>9}')
+        for name, make_id in generators.items():
+            table = f'benchmark_dish_{name}'
+            elapsed = await load(
+                conn, table, make_id, options.rows, options.batch, submenus
+            )
+            for index in await index_sizes(conn, table):
+                print(
+                    f'{name:<6} {options.rows:>9} {elapsed:>9.2f} '
+                    f'{options.rows / elapsed:>10.0f} '
+                    f'{index["name"]:<40} {index["size"] / 2 ** 20:>9.1f}'
+                )
+    finally:
+        await conn.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
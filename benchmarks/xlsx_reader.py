@@ -0,0 +1,105 @@
+"""
+Бенчмарк чтения таблицы меню: pandas против потокового openpyxl.
+
+Создаёт во временном каталоге книгу из --rows строк в формате
+api/admin/Menu.xlsx (меню, подменю и блюда со сдвигом на колонку)
+и разбирает её тремя способами: pd.read_excel с обходом iterrows()
+(прежний путь синхронизации), read_menu_rows() на openpyxl
+в режиме read_only и read_menu_frames() - векторный разбор
+в три DataFrame. Выводит время и пик памяти (tracemalloc).
+
+Запуск: python -m benchmarks.xlsx_reader [--rows 100000]
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook
+
+from api.celery2.workbook import read_menu_frames, read_menu_rows
+
+# Через сколько строк начинается новое меню и новое подменю
+# (подменю - сразу после меню и далее каждые SUBMENU_EVERY строк)
+MENU_EVERY = 1000
+SUBMENU_EVERY = 50
+
+
+def write_workbook(path: Path, rows: int) -> None:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for number in range(rows):
+        if number % MENU_EVERY == 0:
+            sheet.append([str(uuid.uuid4()), f'Меню {number}', 'Описание'])
+        elif number % SUBMENU_EVERY == 1:
+            sheet.append(
+                [None, str(uuid.uuid4()), f'Подменю {number}', 'Описание']
+            )
+        else:
+            sheet.append([
+                None, None, str(uuid.uuid4()), f'Блюдо {number}',
+                f'Описание блюда {number}', number % 1000 + 0.99
+            ])
+    workbook.save(path)
+
+
+def read_pandas(path: Path) -> int:
+    menu_df = pd.read_excel(path, header=None)
+    parsed = 0
+    for index, row in menu_df.iterrows():
+        if pd.notnull(row.iloc[0]):
+            parsed += 1
+        elif row.iloc[1:4].notna().all():
+            parsed += 1
+        elif row.iloc[2:6].notna().all():
+            parsed += 1
+    return parsed
+
+
+def read_streaming(path: Path) -> int:
+    return sum(1 for _ in read_menu_rows(str(path)))
+
+
+def read_frames(path: Path) -> int:
+    return sum(len(frame) for frame in read_menu_frames(str(path)))
+
+
+def measure(read: Callable[[Path], int], path: Path) -> tuple[int, float, int]:
+    # Время и память в разных прогонах: tracemalloc замедляет чтение
+    started = time.perf_counter()
+    parsed = read(path)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    read(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return parsed, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    options = parser.parse_args()
+
+    readers = {
+        'pandas': read_pandas,
+        'openpyxl': read_streaming,
+        'frames': read_frames,
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'Menu.xlsx'
+        write_workbook(path, options.rows)
+        print(f'{"reader":<9} {"rows":>8} {"seconds":>8} {"peak, MB":>9}')
+        for name, read in readers.items():
+            parsed, elapsed, peak = measure(read, path)
+            print(f'{name:<9} {parsed:>8} {elapsed:>8.2f} '
+                  f'{peak / 2 ** 20:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,16 @@
+import asyncio
+
 import redis
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 
-from api.config.config import REDIS_DB, REDIS_HOST, REDIS_PORT
+from api.cache.backend import TwoTierBackend
+from api.cache.client import redis_client as async_redis_client
+from api.cache.coder import OrjsonCoder
+from api.cache.invalidation import listen_for_invalidations
+from api.cache.key_builder import key_builder
+from api.config.config import CACHE_PREFIX, REDIS_DB, REDIS_HOST, REDIS_PORT
 from api.endpoints.router import router as router_operation
 
 load_dotenv()
@@ -29,5 +35,22 @@ except redis.ConnectionError as e:
     print(f'Ошибка подключения к Redis: {e}')
 
 
-cache_backend = RedisBackend(redis_client)
-FastAPICache.init(cache_backend, prefix='fastapi-cache')
+cache_backend = TwoTierBackend(async_redis_client)
+FastAPICache.init(
+    cache_backend,
+    prefix=CACHE_PREFIX,
+    coder=OrjsonCoder,
+    key_builder=key_builder
+)
+
+
+@app.on_event('startup')
+async def start_invalidation_listener() -> None:
+    app.state.invalidation_listener = asyncio.create_task(
+        listen_for_invalidations()
+    )
+
+
+@app.on_event('shutdown')
+async def stop_invalidation_listener() -> None:
+    app.state.invalidation_listener.cancel()
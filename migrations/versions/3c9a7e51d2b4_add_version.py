@@ -0,0 +1,27 @@
+"""add version
+
+Revision ID: 3c9a7e51d2b4
+Revises: 35f8c3fde5c4
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3c9a7e51d2b4'
+down_revision = '35f8c3fde5c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('Menu', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('Submenu', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('Dish', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('Dish', 'version')
+    op.drop_column('Submenu', 'version')
+    op.drop_column('Menu', 'version')
@@ -0,0 +1,24 @@
+"""add fk indexes
+
+Revision ID: 8e41d0c6a7f3
+Revises: 3c9a7e51d2b4
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8e41d0c6a7f3'
+down_revision = '3c9a7e51d2b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_Submenu_menu_id_id', 'Submenu', ['menu_id', 'id'], unique=False)
+    op.create_index('ix_Dish_submenu_id_id', 'Dish', ['submenu_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_Dish_submenu_id_id', table_name='Dish')
+    op.drop_index('ix_Submenu_menu_id_id', table_name='Submenu')
@@ -0,0 +1,332 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from fastapi_cache import FastAPICache
+
+from api.cache import invalidation
+from api.cache.backend import TwoTierBackend
+from api.cache.client import redis_client
+from api.cache.decorator import cache
+from api.cache.invalidation import invalidate, invalidate_bulk_upsert
+from api.cache.key_builder import build_cache_key
+from api.config.config import BASE_URL, URL
+from api.data.database import engine, pool_metrics, read_pool_metrics
+from api.endpoints import crud, router
+from api.endpoints.router import etag_matches, version_etag
+from api.models.records import MenuRecord
+from main import app
+
+
+# Ключ кэша не зависит от сессии БД
+def test_cache_key_ignores_db_session() -> None:
+    func = crud.get_menu_by_id.__wrapped__
+    menu_id = uuid.uuid4()
+
+    first_key = build_cache_key(func, 'menu', (menu_id, object()), {})
+    second_key = build_cache_key(func, 'menu', (menu_id, object()), {})
+    other_key = build_cache_key(func, 'menu', (uuid.uuid4(), object()), {})
+
+    assert first_key == second_key
+    assert first_key != other_key
+    assert first_key == (
+        f'fastapi-cache:menu:get_menu_by_id:menu_id={menu_id}'
+    )
+
+
+# Ключ списка строится из параметров запроса
+def test_cache_key_uses_query_params() -> None:
+    func = crud.get_menu_list.__wrapped__
+
+    key = build_cache_key(func, 'menu', (10, None, object()), {})
+
+    assert key == 'fastapi-cache:menu:get_menu_list:limit=10:cursor=None'
+
+
+# Повторный GET отдаётся из кэша, без обращения к БД
+@pytest.mark.asyncio
+async def test_repeated_get_served_from_cache(monkeypatch) -> None:
+    calls = []
+    get_menu_or_404 = crud.get_menu_or_404
+
+    async def counting_get_menu_or_404(*args, **kwargs):
+        calls.append(args)
+        return await get_menu_or_404(*args, **kwargs)
+
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        response = await client.post(f'/{URL}', json={
+            'title': f'CACHED_MENU_PYTEST_{uuid.uuid4()}',
+            'description': f'CACHED_MENU_PYTEST_{uuid.uuid4()}'
+        })
+        assert response.status_code == 201
+        menu_id = response.json()['id']
+
+        monkeypatch.setattr(
+            crud, 'get_menu_or_404', counting_get_menu_or_404
+        )
+        first = await client.get(f'/{URL}/{menu_id}')
+        second = await client.get(f'/{URL}/{menu_id}')
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert len(calls) == 1, 'Повторный запрос не был отдан из кэша'
+
+
+# Конкурентные промахи по одному ключу вычисляются один раз
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced() -> None:
+    calls = []
+
+    @cache(expire=60, namespace='test')
+    async def slow_lookup(item_id: str, db: object) -> dict:
+        calls.append(item_id)
+        await asyncio.sleep(0.05)
+        return {'id': item_id}
+
+    item_id = str(uuid.uuid4())
+    results = await asyncio.gather(
+        *(slow_lookup(item_id, object()) for _ in range(20))
+    )
+
+    assert len(calls) == 1
+    assert results == [{'id': item_id}] * 20
+
+
+# Общее вычисление идёт в своей сессии: отмена первого вызова
+# не роняет остальных, сессия запроса в вычисление не попадает
+# (без сессии из get_read_db - основной сервер)
+@pytest.mark.asyncio
+async def test_coalesced_miss_uses_own_session() -> None:
+    sessions = []
+
+    @cache(expire=60, namespace='test')
+    async def slow_lookup(item_id: str, db: object) -> dict:
+        sessions.append(db)
+        await asyncio.sleep(0.05)
+        return {'id': item_id}
+
+    item_id = str(uuid.uuid4())
+    request_session = object()
+    first = asyncio.ensure_future(slow_lookup(item_id, request_session))
+    await asyncio.sleep(0)
+    followers = asyncio.gather(
+        *(slow_lookup(item_id, object()) for _ in range(5))
+    )
+    first.cancel()
+
+    assert await followers == [{'id': item_id}] * 5
+    assert len(sessions) == 1
+    assert sessions[0] is not request_session
+    assert sessions[0].bind is engine
+
+
+# Первый GET после создания меню отдаётся из кэша (write-through)
+@pytest.mark.asyncio
+async def test_get_after_create_served_from_cache(monkeypatch) -> None:
+    calls = []
+
+    async def forbidden_get_menu_or_404(*args, **kwargs):
+        calls.append(args)
+
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        response = await client.post(f'/{URL}', json={
+            'title': f'PRIMED_MENU_PYTEST_{uuid.uuid4()}',
+            'description': f'PRIMED_MENU_PYTEST_{uuid.uuid4()}'
+        })
+        assert response.status_code == 201
+        created = response.json()
+
+        monkeypatch.setattr(
+            crud, 'get_menu_or_404', forbidden_get_menu_or_404
+        )
+        response = await client.get(f'/{URL}/{created["id"]}')
+
+    assert response.status_code == 200
+    assert response.json() == created
+    assert calls == [], 'GET после создания ушёл в БД'
+
+
+# Сравнение If-None-Match со списком и слабыми тегами
+def test_etag_matches() -> None:
+    etag = '"abc"'
+
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"xyz", W/"abc"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"xyz"', etag)
+    assert not etag_matches(None, etag)
+
+
+# ETag считается по id и version строки, откуда бы она ни пришла
+def test_version_etag() -> None:
+    menu_id = uuid.uuid4()
+    record = MenuRecord(menu_id, 'menu', None, 0, 0, 3)
+    cached = {'id': str(menu_id), 'title': 'other', 'version': 3}
+
+    assert version_etag([record]) == version_etag([cached])
+    assert version_etag([record]) != version_etag([{**cached, 'version': 4}])
+    assert version_etag([record], None) != version_etag([record], 'cursor')
+
+
+# If-None-Match: * не даёт 304 для несуществующего меню
+@pytest.mark.asyncio
+async def test_any_etag_requires_existing_menu() -> None:
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        response = await client.get(
+            f'/{URL}/{uuid.uuid4()}',
+            headers={'If-None-Match': '*'}
+        )
+
+    assert response.status_code == 404
+
+
+# Условный GET: 304 до изменения меню, новый ETag после
+@pytest.mark.asyncio
+async def test_conditional_get_by_etag() -> None:
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        response = await client.post(f'/{URL}', json={
+            'title': f'ETAG_MENU_PYTEST_{uuid.uuid4()}',
+            'description': f'ETAG_MENU_PYTEST_{uuid.uuid4()}'
+        })
+        assert response.status_code == 201
+        menu_id = response.json()['id']
+
+        response = await client.get(f'/{URL}/{menu_id}')
+        etag = response.headers['ETag']
+
+        response = await client.get(
+            f'/{URL}/{menu_id}',
+            headers={'If-None-Match': etag}
+        )
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+
+        response = await client.patch(f'/{URL}/{menu_id}', json={
+            'title': 'ETAG_MENU_UPDATED',
+            'description': 'ETAG_MENU_UPDATED'
+        })
+        assert response.status_code == 200
+
+        response = await client.get(
+            f'/{URL}/{menu_id}',
+            headers={'If-None-Match': etag}
+        )
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.json()['title'] == 'ETAG_MENU_UPDATED'
+        etag = response.headers['ETag']
+
+        # Новое подменю меняет счётчики, а с ними version меню
+        response = await client.post(f'/{URL}/{menu_id}/submenus', json={
+            'title': 'ETAG_SUBMENU',
+            'description': 'ETAG_SUBMENU'
+        })
+        assert response.status_code == 201
+
+        response = await client.get(
+            f'/{URL}/{menu_id}',
+            headers={'If-None-Match': etag}
+        )
+        await client.delete(f'/{URL}/{menu_id}')
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.json()['submenus_count'] == 1
+
+
+# ETag выгрузки берётся из поколения тега 'tree': дерево для него
+# не собирается, а запись в меню меняет ETag
+@pytest.mark.asyncio
+async def test_export_etag_follows_tree_tag(monkeypatch) -> None:
+    async def stream(db):
+        yield '{}\n'
+
+    monkeypatch.setattr(
+        router, 'stream_all_menus_with_submenus_and_dishes', stream
+    )
+    url = '/api/v1/menus-with-submenus-and-dishes/export'
+
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        response = await client.get(url)
+        assert response.status_code == 200
+        assert response.text == '{}\n'
+        etag = response.headers['ETag']
+
+        response = await client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+        await invalidate('tree')
+        response = await client.get(url, headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+# Запрос, отданный из кэша, не берёт соединений из пула
+@pytest.mark.asyncio
+async def test_cache_hit_does_not_touch_pool() -> None:
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        response = await client.post(f'/{URL}', json={
+            'title': f'LAZY_SESSION_MENU_PYTEST_{uuid.uuid4()}',
+            'description': 'LAZY_SESSION_MENU_PYTEST'
+        })
+        assert response.status_code == 201
+        menu_id = response.json()['id']
+
+        checkouts = (pool_metrics.checkouts, read_pool_metrics.checkouts)
+        response = await client.get(f'/{URL}/{menu_id}')
+        assert response.status_code == 200
+        assert (
+            pool_metrics.checkouts,
+            read_pool_metrics.checkouts
+        ) == checkouts, 'Попадание в кэш взяло соединение из пула'
+
+        await client.delete(f'/{URL}/{menu_id}')
+
+
+# Запись в кэш с более старой версией строки не вытесняет более новую
+@pytest.mark.asyncio
+async def test_prime_keeps_newest_version(monkeypatch) -> None:
+    monkeypatch.setattr(
+        FastAPICache, '_backend', TwoTierBackend(redis_client)
+    )
+
+    @cache(expire=60, namespace='test')
+    async def lookup(item_id: str, db: object) -> dict:
+        raise AssertionError('Значение должно быть в кэше')
+
+    item_id = str(uuid.uuid4())
+    newer = {'id': item_id, 'dishes_count': 2, 'version': 3}
+    older = {'id': item_id, 'dishes_count': 1, 'version': 2}
+
+    # Вторая запись завершилась раньше первой
+    await lookup.prime(item_id, None, value=newer)
+    await lookup.prime(item_id, None, value=older)
+
+    assert await lookup(item_id, object()) == newer
+
+
+# Пакетная запись сбрасывает только теги изменённых строк и их родителей
+@pytest.mark.asyncio
+async def test_bulk_upsert_invalidates_changed_tags(monkeypatch) -> None:
+    calls = []
+
+    async def record_invalidate(*tags):
+        calls.append(set(tags))
+
+    monkeypatch.setattr(invalidation, 'invalidate', record_invalidate)
+    submenu_id, dish_id = uuid.uuid4(), uuid.uuid4()
+
+    await invalidate_bulk_upsert((), (), ())
+    # Изменилось только название блюда: счётчики и меню не трогаются
+    await invalidate_bulk_upsert(
+        (), (), [dish_id], dish_lists=[submenu_id]
+    )
+
+    assert calls == [{
+        'tree',
+        f'submenu:{submenu_id}:dishes',
+        f'dish:{dish_id}',
+    }]
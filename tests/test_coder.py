@@ -0,0 +1,53 @@
+import uuid
+
+import pytest
+
+from api.cache.coder import ZLIB, OrjsonCoder
+from api.config.config import CACHE_COMPRESS_MIN_SIZE
+from api.models.models import Menu
+
+
+def tree_row(dishes: int) -> dict:
+    # Словарь, как из row_to_json (см. returned_row), с вложенными списками
+    return {
+        'id': str(uuid.uuid4()), 'title': 'Меню', 'description': None,
+        'submenus': [{
+            'id': str(uuid.uuid4()), 'title': 'Подменю', 'description': 'ß',
+            'dishes': [
+                {'id': str(uuid.uuid4()), 'title': f'Блюдо {d}', 'price': '9.99'}
+                for d in range(dishes)
+            ],
+        }],
+    }
+
+
+# Значение переживает encode/decode и остаётся строкой, как требует Coder
+@pytest.mark.parametrize('value', [
+    tree_row(dishes=1),
+    tree_row(dishes=CACHE_COMPRESS_MIN_SIZE),
+    [tree_row(dishes=2), None],
+    '[{"title": "Меню"}]',
+])
+def test_round_trip(value) -> None:
+    encoded = OrjsonCoder.encode(value)
+
+    assert isinstance(encoded, str)
+    assert OrjsonCoder.decode(encoded) == value
+
+
+def test_large_value_is_compressed() -> None:
+    encoded = OrjsonCoder.encode(tree_row(dishes=CACHE_COMPRESS_MIN_SIZE))
+
+    assert encoded.encode('latin-1')[:1] == ZLIB
+
+
+def test_round_trip_orm_instance() -> None:
+    menu = Menu(
+        id=uuid.uuid4(), title='Меню', description=None,
+        submenus_count=1, dishes_count=2, version=3
+    )
+
+    assert OrjsonCoder.decode(OrjsonCoder.encode(menu)) == {
+        'id': str(menu.id), 'title': 'Меню', 'description': None,
+        'submenus_count': 1, 'dishes_count': 2, 'version': 3,
+    }
@@ -0,0 +1,66 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from api.config.config import BASE_URL, URL
+from api.data.database import AsyncSessionLocal
+from api.endpoints.crud import create_dish_func
+from api.models.models import Dish, Menu, Submenu
+from api.schemas.schemas import DishSchema
+from main import app
+
+PARALLEL_DISHES = 200
+
+
+async def create_dish_in_own_session(menu_id: str, submenu_id: str) -> None:
+    dish = DishSchema(
+        title=f'PARALLEL_DISH_PYTEST_{uuid.uuid4()}',
+        description='PARALLEL_DISH_PYTEST',
+        price='10.00'
+    )
+    async with AsyncSessionLocal() as db:
+        await create_dish_func(menu_id, submenu_id, dish, db)
+
+
+# Параллельное создание блюд не теряет приращений счётчиков
+@pytest.mark.asyncio
+async def test_parallel_dish_creation_keeps_counts() -> None:
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        response = await client.post(f'/{URL}', json={
+            'title': f'PARALLEL_MENU_PYTEST_{uuid.uuid4()}',
+            'description': 'PARALLEL_MENU_PYTEST'
+        })
+        assert response.status_code == 201
+        menu_id = response.json()['id']
+
+        response = await client.post(f'/{URL}/{menu_id}/submenus', json={
+            'title': f'PARALLEL_SUBMENU_PYTEST_{uuid.uuid4()}',
+            'description': 'PARALLEL_SUBMENU_PYTEST'
+        })
+        assert response.status_code == 201
+        submenu_id = response.json()['id']
+
+        await asyncio.gather(*(
+            create_dish_in_own_session(menu_id, submenu_id)
+            for _ in range(PARALLEL_DISHES)
+        ))
+
+        # Счётчики читаются из БД, а не из кэша
+        async with AsyncSessionLocal() as db:
+            menu = await db.get(Menu, menu_id)
+            submenu = await db.get(Submenu, submenu_id)
+            dishes = await db.scalar(
+                select(func.count(Dish.id))
+                .where(Dish.submenu_id == submenu_id)
+            )
+
+        await client.delete(f'/{URL}/{menu_id}')
+
+    assert dishes == PARALLEL_DISHES
+    assert menu.dishes_count == PARALLEL_DISHES
+    assert menu.submenus_count == 1
+    assert submenu.dishes_count == PARALLEL_DISHES
@@ -0,0 +1,213 @@
+import uuid
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, event, insert
+
+from api.config.config import PAGE_LIMIT
+from api.data.database import AsyncSessionLocal, engine
+from api.endpoints import crud
+from api.models.models import Dish, Menu, Submenu
+from api.schemas.schemas import DishSchema, MenuSchema, SubmenuSchema
+
+# Таблицы, полный просмотр которых недопустим
+LARGE_TABLES = {'Submenu', 'Dish'}
+
+SEED_MENUS = 20
+SUBMENUS_PER_MENU = 50
+DISHES_PER_SUBMENU = 20
+
+# Запросы каскадного удаления выполняет сам Postgres (триггеры внешних
+# ключей), поэтому перехватить их нельзя - проверяем их эквиваленты
+CASCADE_QUERIES = (
+    ('DELETE FROM "Submenu" WHERE menu_id = %s', 'menu'),
+    ('DELETE FROM "Dish" WHERE submenu_id = %s', 'submenu'),
+)
+
+
+@contextmanager
+def captured_queries() -> Iterator[list[tuple[str, Any]]]:
+    queries = []
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        queries.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute',
+                 before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute',
+                     before_cursor_execute)
+
+
+def seq_scans(plan: dict[str, Any]) -> Iterator[str]:
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from seq_scans(child)
+
+
+async def assert_no_seq_scans(queries: list[tuple[str, Any]]) -> None:
+    explained = 0
+    async with engine.connect() as conn:
+        for statement, parameters in queries:
+            keyword = statement.lstrip().split(None, 1)[0].upper()
+            if keyword not in {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'}:
+                continue
+            # EXPLAIN без ANALYZE не выполняет запрос, только планирует
+            result = await conn.exec_driver_sql(
+                f'EXPLAIN (FORMAT JSON) {statement}',
+                parameters
+            )
+            plan = result.scalar()[0]['Plan']
+            scanned = LARGE_TABLES.intersection(seq_scans(plan))
+            assert not scanned, (
+                f'Seq Scan по {sorted(scanned)} в запросе:\n{statement}'
+            )
+            explained += 1
+    assert explained, 'Не перехвачено ни одного запроса'
+
+
+async def call(func, *args) -> Any:
+    # Каждый вызов в своей сессии: функции записи открывают транзакцию сами
+    async with AsyncSessionLocal() as db:
+        return await func(*args, db)
+
+
+@pytest_asyncio.fixture(scope='function')
+async def seeded() -> AsyncGenerator[dict[str, str], None]:
+    menus, submenus, dishes = [], [], []
+    for _ in range(SEED_MENUS):
+        menu_id = uuid.uuid4()
+        menus.append({
+            'id': menu_id,
+            'title': f'EXPLAIN_MENU_PYTEST_{uuid.uuid4()}',
+            'description': 'EXPLAIN_MENU_PYTEST',
+            'submenus_count': SUBMENUS_PER_MENU,
+            'dishes_count': SUBMENUS_PER_MENU * DISHES_PER_SUBMENU
+        })
+        for _ in range(SUBMENUS_PER_MENU):
+            submenu_id = uuid.uuid4()
+            submenus.append({
+                'id': submenu_id,
+                'title': f'EXPLAIN_SUBMENU_PYTEST_{uuid.uuid4()}',
+                'description': 'EXPLAIN_SUBMENU_PYTEST',
+                'dishes_count': DISHES_PER_SUBMENU,
+                'menu_id': str(menu_id)
+            })
+            dishes.extend({
+                'id': uuid.uuid4(),
+                'title': f'EXPLAIN_DISH_PYTEST_{uuid.uuid4()}',
+                'description': 'EXPLAIN_DISH_PYTEST',
+                'price': '10.00',
+                'submenu_id': str(submenu_id)
+            } for _ in range(DISHES_PER_SUBMENU))
+
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            await db.execute(insert(Menu), menus)
+            await db.execute(insert(Submenu), submenus)
+            await db.execute(insert(Dish), dishes)
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql('ANALYZE "Menu", "Submenu", "Dish"')
+
+    yield {
+        'menu': str(menus[0]['id']),
+        'submenu': str(submenus[0]['id']),
+        'dish': str(dishes[0]['id']),
+        'other_menu': str(menus[-1]['id'])
+    }
+
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            await db.execute(
+                delete(Menu).where(Menu.id.in_([m['id'] for m in menus]))
+            )
+
+
+# Запросы чтения не просматривают большие таблицы целиком
+@pytest.mark.asyncio
+async def test_read_queries_use_indexes(seeded) -> None:
+    menu_id, submenu_id = seeded['menu'], seeded['submenu']
+
+    with captured_queries() as queries:
+        _, cursor = await call(
+            crud.get_menu_list.__wrapped__, PAGE_LIMIT, None
+        )
+        await call(crud.get_menu_list.__wrapped__, 1, cursor)
+        await call(crud.get_menu_by_id.__wrapped__, menu_id)
+
+        _, cursor = await call(
+            crud.get_list_submenu.__wrapped__, menu_id, 10, None
+        )
+        await call(crud.get_list_submenu.__wrapped__, menu_id, 10, cursor)
+        await call(crud.get_submenu_by_id.__wrapped__, menu_id, submenu_id)
+
+        _, cursor = await call(
+            crud.get_list_dish.__wrapped__, menu_id, submenu_id, 5, None
+        )
+        await call(
+            crud.get_list_dish.__wrapped__, menu_id, submenu_id, 5, cursor
+        )
+        await call(
+            crud.get_dish_by_id.__wrapped__,
+            menu_id,
+            submenu_id,
+            seeded['dish']
+        )
+
+        await call(
+            crud.get_all_menus_with_submenus_and_dishes_func.__wrapped__
+        )
+
+    await assert_no_seq_scans(queries)
+
+
+# Запросы записи и каскадное удаление не просматривают большие таблицы
+@pytest.mark.asyncio
+async def test_write_queries_use_indexes(seeded) -> None:
+    menu_id, submenu_id = seeded['menu'], seeded['submenu']
+    dish = DishSchema(
+        title=f'EXPLAIN_NEW_DISH_PYTEST_{uuid.uuid4()}',
+        description='EXPLAIN_NEW_DISH_PYTEST',
+        price='12.00'
+    )
+    submenu = SubmenuSchema(
+        title=f'EXPLAIN_NEW_SUBMENU_PYTEST_{uuid.uuid4()}',
+        description='EXPLAIN_NEW_SUBMENU_PYTEST'
+    )
+
+    with captured_queries() as queries:
+        await call(crud.put_menu, menu_id, MenuSchema(
+            title=f'EXPLAIN_MENU_UPDATED_PYTEST_{uuid.uuid4()}',
+            description='EXPLAIN_MENU_UPDATED_PYTEST'
+        ))
+        created_submenu = await call(
+            crud.create_submenu_func, menu_id, submenu
+        )
+        await call(
+            crud.put_submenu, menu_id, created_submenu['id'], submenu
+        )
+        created_dish = await call(
+            crud.create_dish_func, menu_id, submenu_id, dish
+        )
+        await call(
+            crud.put_dish, menu_id, submenu_id, created_dish['id'], dish
+        )
+        await call(
+            crud.delete_dish, menu_id, submenu_id, created_dish['id']
+        )
+        await call(crud.delete_submenu, menu_id, created_submenu['id'])
+        await call(crud.delete_menu, seeded['other_menu'])
+
+    queries.extend(
+        (statement, (seeded[parameter],))
+        for statement, parameter in CASCADE_QUERIES
+    )
+    await assert_no_seq_scans(queries)
@@ -0,0 +1,72 @@
+import uuid
+
+import httpx
+import pytest
+
+from api.config.config import BASE_URL, URL
+from main import app
+
+
+# Вложенные маршруты проверяют весь путь и называют ненайденную часть
+@pytest.mark.asyncio
+async def test_nested_routes_validate_path() -> None:
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        menu_ids = []
+        for _ in range(2):
+            response = await client.post(f'/{URL}', json={
+                'title': f'PATH_MENU_PYTEST_{uuid.uuid4()}',
+                'description': 'PATH_MENU_PYTEST'
+            })
+            assert response.status_code == 201
+            menu_ids.append(response.json()['id'])
+        menu_id, other_menu_id = menu_ids
+
+        response = await client.post(f'/{URL}/{menu_id}/submenus', json={
+            'title': f'PATH_SUBMENU_PYTEST_{uuid.uuid4()}',
+            'description': 'PATH_SUBMENU_PYTEST'
+        })
+        submenu_id = response.json()['id']
+        dishes_url = f'/{URL}/{menu_id}/submenus/{submenu_id}/dishes'
+        response = await client.post(dishes_url, json={
+            'title': f'PATH_DISH_PYTEST_{uuid.uuid4()}',
+            'description': 'PATH_DISH_PYTEST',
+            'price': '1.00'
+        })
+        dish_id = response.json()['id']
+
+        responses = {
+            'menu not found': await client.get(
+                f'/{URL}/{uuid.uuid4()}/submenus/{submenu_id}'
+                f'/dishes/{dish_id}'
+            ),
+            'submenu not found': await client.get(
+                f'/{URL}/{other_menu_id}/submenus/{submenu_id}'
+                f'/dishes/{dish_id}'
+            ),
+            'dish not found': await client.get(
+                f'{dishes_url}/{uuid.uuid4()}'
+            ),
+        }
+        # Списки под чужим или несуществующим родителем - 404, а не []
+        list_responses = {
+            'menu not found': await client.get(
+                f'/{URL}/{uuid.uuid4()}/submenus'
+            ),
+            'submenu not found': await client.get(
+                f'/{URL}/{other_menu_id}/submenus/{submenu_id}/dishes'
+            ),
+        }
+        wrong_delete = await client.delete(
+            f'/{URL}/{other_menu_id}/submenus/{submenu_id}/dishes/{dish_id}'
+        )
+        dish = await client.get(f'{dishes_url}/{dish_id}')
+
+        for created_menu_id in menu_ids:
+            await client.delete(f'/{URL}/{created_menu_id}')
+
+    for detail, response in [*responses.items(), *list_responses.items()]:
+        assert response.status_code == 404
+        assert response.json()['detail'] == detail
+    assert wrong_delete.status_code == 404
+    assert wrong_delete.json()['detail'] == 'submenu not found'
+    assert dish.status_code == 200
@@ -0,0 +1,21 @@
+import uuid
+
+from api.data.ids import uuid7
+from api.schemas.schemas import MenuSchemaWithID
+
+
+# uuid7 возрастает даже для id, выданных в одну миллисекунду
+def test_uuid7_is_time_ordered() -> None:
+    ids = [uuid7() for _ in range(10000)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert {value.version for value in ids} == {7}
+    assert {value.variant for value in ids} == {uuid.RFC_4122}
+
+
+# Схемы принимают и старые id версии 4, и новые версии 7
+def test_schemas_accept_uuid4_and_uuid7() -> None:
+    for value in (uuid.uuid4(), uuid7()):
+        menu = MenuSchemaWithID(id=value, title='menu', description='menu')
+        assert menu.id == value
@@ -1,3 +1,4 @@
+import json
 import uuid
 from typing import AsyncGenerator
 
@@ -419,42 +420,112 @@ class TestMenu:
     # Тестирует показ всех связанных сущностей
     @pytest.mark.order(18)
     @pytest.mark.asyncio
-    async def test_get_list_all(self, http_client) -> None:
+    async def test_get_list_all(
+        self,
+        menu_id,
+        submenu_id,
+        dish_id,
+        http_client
+    ) -> None:
         async for client in http_client:
             response = await client.get(
                 '/api/v1/menus-with-submenus-and-dishes/'
             )
             assert response.status_code == 200
+            assert response.headers['content-type'] == 'application/json'
+
+            menus = {menu['id']: menu for menu in response.json()}
+            assert menu_id in menus, 'Меню отсутствует в дереве'
+            current_menu = menus[menu_id]
+            assert current_menu['submenus_count'] == 1
+            assert current_menu['dishes_count'] == 1
+
+            assert [
+                submenu['id'] for submenu in current_menu['submenus']
+            ] == [submenu_id]
+            current_submenu = current_menu['submenus'][0]
+            assert current_submenu['dishes_count'] == 1
+
+            assert [
+                dish['id'] for dish in current_submenu['dishes']
+            ] == [dish_id]
+            assert set(current_submenu['dishes'][0]) == {
+                'id', 'title', 'description', 'price'
+            }
+
+    # Тестирует потоковую выгрузку всех связанных сущностей
+    @pytest.mark.order(19)
+    @pytest.mark.asyncio
+    async def test_export_all(
+        self,
+        menu_id,
+        submenu_id,
+        dish_id,
+        http_client
+    ) -> None:
+        async for client in http_client:
+            response = await client.get(
+                '/api/v1/menus-with-submenus-and-dishes/export'
+            )
+            assert response.status_code == 200
+            assert response.headers['content-type'] == 'application/x-ndjson'
 
-            expected_menu = [
-                {
-                    'id': '1ae2748c-6f3b-4c0f-a32a-09eea3a805ad',
-                    'title': 'Menu 1',
-                    'description': 'Description 1',
-                    'submenus_count': 2,
-                    'dishes_count': 5
-                },
-            ]
-            expected_submenu = [
-                {
-                    'menu_id': '1ae2748c-6f3b-4c0f-a32a-09eea3a805ad',
-                    'id': '2ae2748c-6f3b-4c0f-a32a-02eea3a326ad',
-                    'title': 'Submenu 1',
-                    'description': 'Description 1',
-                    'dishes_count': 3
-                },
-            ]
-            expected_dishes_list = [
-                {
-                    'submenu_id': '2ae2748c-6f3b-4c0f-a32a-02eea3a326ad',
-                    'id': '3ae2778c-6f6b-4c0f-a42a-02eea3a222ad',
-                    'title': 'Dish 1',
-                    'description': 'Description 1'
-                },
-            ]
-
-            assert response.json() == {
-                'menu': expected_menu,
-                'submenu': expected_submenu,
-                'dishes_list': expected_dishes_list,
+            lines = response.text.splitlines()
+            menus = {
+                menu['id']: menu for menu in map(json.loads, lines)
             }
+            assert len(menus) == len(lines)
+            assert menu_id in menus, 'Меню отсутствует в выгрузке'
+
+            current_submenu = menus[menu_id]['submenus'][0]
+            assert current_submenu['id'] == submenu_id
+            assert current_submenu['dishes'][0]['id'] == dish_id
+
+    # Тестирует курсорную пагинацию списка подменю
+    @pytest.mark.order(20)
+    @pytest.mark.asyncio
+    async def test_paginate_submenus(self, menu_id, http_client) -> None:
+        async for client in http_client:
+            created = []
+            for _ in range(3):
+                response = await client.post(
+                    f'/{self.url}/{menu_id}/submenus',
+                    json={
+                        'title': f'PAGE_SUBMENU_PYTEST_{uuid.uuid4()}',
+                        'description': f'PAGE_SUBMENU_PYTEST_{uuid.uuid4()}'
+                    }
+                )
+                assert response.status_code == 201
+                created.append(response.json()['title'])
+
+            # В схеме списка подменю нет id, страницы сравниваются по title
+            response = await client.get(
+                f'/{self.url}/{menu_id}/submenus', params={'limit': 2}
+            )
+            assert response.status_code == 200
+            first_page = [submenu['title'] for submenu in response.json()]
+            assert len(first_page) == 2
+            cursor = response.headers['X-Next-Cursor']
+
+            response = await client.get(
+                f'/{self.url}/{menu_id}/submenus',
+                params={'limit': 2, 'cursor': cursor}
+            )
+            assert response.status_code == 200
+            second_page = [submenu['title'] for submenu in response.json()]
+            assert len(second_page) == 1
+            assert 'X-Next-Cursor' not in response.headers
+            assert sorted(first_page + second_page) == sorted(created)
+
+            # Без limit и cursor список отдаётся целиком, без курсора
+            response = await client.get(f'/{self.url}/{menu_id}/submenus')
+            assert response.status_code == 200
+            titles = [submenu['title'] for submenu in response.json()]
+            assert set(created) <= set(titles)
+            assert 'X-Next-Cursor' not in response.headers
+
+            response = await client.get(
+                f'/{self.url}/{menu_id}/submenus',
+                params={'cursor': 'not-a-cursor'}
+            )
+            assert response.status_code == 400
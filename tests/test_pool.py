@@ -0,0 +1,57 @@
+import sqlite3
+
+import httpx
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from api.config.config import BASE_URL
+from api.data.database import PoolMetrics, engine, timed_pool_class
+from main import app
+
+
+# Выдача и возврат соединения двигают счётчики и время ожидания,
+# ожидание сверх pool_timeout считается отдельно
+@pytest.mark.asyncio
+async def test_pool_metrics_track_checkouts() -> None:
+    metrics = PoolMetrics()
+    pool = timed_pool_class(metrics)(
+        lambda: sqlite3.connect(':memory:', check_same_thread=False),
+        pool_size=1,
+        max_overflow=0,
+        timeout=0.05
+    )
+
+    connection = await greenlet_spawn(pool.connect)
+    assert metrics.snapshot(pool)['checked_out'] == 1
+    assert metrics.checkouts == 1
+    assert metrics.wait_total > 0
+
+    # Единственное соединение занято: второй запрос ждёт pool_timeout
+    with pytest.raises(exc.TimeoutError):
+        await greenlet_spawn(pool.connect)
+    assert metrics.timeouts == 1
+    assert metrics.wait_max >= 0.05
+
+    await greenlet_spawn(connection.close)
+    snapshot = metrics.snapshot(pool)
+    assert snapshot['checked_out'] == 0
+    assert snapshot['checkouts'] == 2
+    assert snapshot['wait_seconds_avg'] == metrics.wait_total / 2
+
+
+# /metrics/db-pool отдаёт метрики пула основного сервера
+@pytest.mark.asyncio
+async def test_db_pool_metrics_route() -> None:
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        before = (await client.get('/api/v1/metrics/db-pool')).json()
+
+        async with engine.connect():
+            during = (await client.get('/api/v1/metrics/db-pool')).json()
+        after = (await client.get('/api/v1/metrics/db-pool')).json()
+
+    primary = during['primary']
+    assert primary['checkouts'] == before['primary']['checkouts'] + 1
+    assert primary['checked_out'] == before['primary']['checked_out'] + 1
+    assert primary['wait_seconds_total'] > before['primary']['wait_seconds_total']
+    assert after['primary']['checked_out'] == before['primary']['checked_out']
@@ -0,0 +1,127 @@
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import httpx
+import pytest
+from fastapi_cache import FastAPICache
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from api.cache.backend import TwoTierBackend
+from api.cache.client import redis_client
+from api.cache.decorator import cache
+from api.config.config import BASE_URL, CACHE_REPLICA_TTL, URL
+from api.data import database
+from api.data.database import (
+    READ_PRIMARY_COOKIE,
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    LazySession,
+    engine,
+    read_engine,
+)
+from api.service.service import encode_cursor
+from main import app
+
+
+@contextmanager
+def counted_queries(target: AsyncEngine) -> Iterator[list[str]]:
+    queries = []
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        queries.append(statement)
+
+    event.listen(target.sync_engine, 'before_cursor_execute',
+                 before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(target.sync_engine, 'before_cursor_execute',
+                     before_cursor_execute)
+
+
+def uncached_list_url() -> str:
+    # Курсор со случайным id даёт новый ключ кэша, то есть промах
+    return f'/{URL}?cursor={encode_cursor(uuid.uuid4())}'
+
+
+# GET-запросы читают с реплики, запись идёт на основной сервер
+@pytest.mark.asyncio
+async def test_reads_go_to_replica() -> None:
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        with counted_queries(engine) as primary, \
+                counted_queries(read_engine) as replica:
+            response = await client.get(uncached_list_url())
+        assert response.status_code == 200
+        assert replica and not primary
+
+        with counted_queries(engine) as primary, \
+                counted_queries(read_engine) as replica:
+            response = await client.post(f'/{URL}', json={
+                'title': f'REPLICA_MENU_PYTEST_{uuid.uuid4()}',
+                'description': 'REPLICA_MENU_PYTEST'
+            })
+        assert response.status_code == 201
+        assert primary and not replica
+        assert READ_PRIMARY_COOKIE not in response.cookies
+
+        await client.delete(f'/{URL}/{response.json()["id"]}')
+
+
+# В окне read-your-writes клиент после записи читает с основного сервера
+@pytest.mark.asyncio
+async def test_read_your_writes_window(monkeypatch) -> None:
+    monkeypatch.setattr(database, 'READ_YOUR_WRITES_WINDOW', 5)
+
+    async with httpx.AsyncClient(app=app, base_url=BASE_URL) as client:
+        response = await client.post(f'/{URL}', json={
+            'title': f'RYW_MENU_PYTEST_{uuid.uuid4()}',
+            'description': 'RYW_MENU_PYTEST'
+        })
+        assert response.status_code == 201
+        assert READ_PRIMARY_COOKIE in response.cookies
+        menu_id = response.json()['id']
+
+        with counted_queries(engine) as primary, \
+                counted_queries(read_engine) as replica:
+            response = await client.get(uncached_list_url())
+        assert response.status_code == 200
+        assert primary and not replica
+
+        await client.delete(f'/{URL}/{menu_id}')
+
+
+# Промах кэша вычисляется на сервере, куда направлен запрос;
+# запись с реплики свежа не дольше CACHE_REPLICA_TTL
+@pytest.mark.asyncio
+@pytest.mark.parametrize('session_factory, bind, fresh', [
+    (AsyncReadSessionLocal, read_engine, CACHE_REPLICA_TTL),
+    (AsyncSessionLocal, engine, 60),
+])
+async def test_cache_fill_follows_request_session(
+    monkeypatch,
+    session_factory,
+    bind,
+    fresh
+) -> None:
+    monkeypatch.setattr(
+        FastAPICache, '_backend', TwoTierBackend(redis_client)
+    )
+    sessions = []
+
+    @cache(expire=60, namespace='test', stale_ttl=10)
+    async def lookup(item_id: str, db: object) -> dict:
+        sessions.append(db)
+        return {'id': item_id}
+
+    item_id = str(uuid.uuid4())
+    await lookup(item_id, LazySession(session_factory))
+    ttl, _ = await FastAPICache.get_backend().get_with_ttl(
+        f'fastapi-cache:test:lookup:item_id={item_id}'
+    )
+
+    assert sessions[0].bind is bind
+    assert fresh < ttl <= fresh + 10
@@ -0,0 +1,42 @@
+import uuid
+
+import orjson
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from api.models.records import DishRecord, MenuRecord
+from api.schemas.schemas import (
+    CreateSubMenu,
+    DishesReturn,
+    MenuSchema,
+    MenuSchemaWithID,
+    serializer_for,
+)
+
+
+def validated(schema, content):
+    return jsonable_encoder(schema.model_validate(content))
+
+
+# Готовый сериализатор даёт тот же JSON, что и проверка схемой
+@pytest.mark.parametrize('schema, content', [
+    (MenuSchema, MenuRecord(uuid.uuid4(), 'menu', 'menu', 1, 2, 1)),
+    (DishesReturn, DishRecord(uuid.uuid4(), 'dish', None, '9.99', 1)),
+    (MenuSchemaWithID, {
+        'id': str(uuid.uuid4()), 'title': 'menu', 'description': 'menu',
+        'submenus_count': 0, 'dishes_count': 0, 'version': 1
+    }),
+    (CreateSubMenu, {
+        'id': str(uuid.uuid4()), 'title': 'submenu', 'description': None,
+        'dishes_count': 0, 'menu_id': str(uuid.uuid4())
+    }),
+])
+def test_serializer_matches_schema(schema, content) -> None:
+    serializer = serializer_for(schema)
+
+    assert orjson.loads(serializer.dumps(content)) == validated(
+        schema, content
+    )
+    assert orjson.loads(serializer_for(schema, many=True).dumps(
+        [content, content]
+    )) == [validated(schema, content)] * 2
@@ -0,0 +1,296 @@
+import asyncio
+import os
+import shutil
+import uuid
+from collections.abc import AsyncGenerator
+
+import pandas as pd
+import pytest
+import pytest_asyncio
+from openpyxl import Workbook
+from sqlalchemy import delete, func
+from sqlalchemy.future import select
+
+from api.cache import invalidation
+from api.cache.client import redis_client
+from api.celery2 import tasks
+from api.celery2.workbook import (
+    DishRow,
+    MenuRow,
+    SubmenuRow,
+    parse_frames,
+    parse_rows,
+    read_cells,
+    read_menu_frames,
+    read_menu_rows,
+)
+from api.data.database import AsyncSessionLocal
+from api.models.models import Dish, Menu, Submenu
+from api.service.bulk import left_parents, regrouped_parents
+
+# Блюдо «Сельдь Бисмарк» из api/admin/Menu.xlsx
+DISH_ID = '14383c63-39f3-490f-adc7-701cb8d1c904'
+
+# Лист с пустой строкой, целой ценой и меню без подменю
+CELLS = [
+    ('m1', 'Меню', 'Основное', None, None, None),
+    (None, 's1', 'Закуски', 'К пиву', None, None),
+    (None, None, 'd1', 'Сельдь', 'Блюдо', 182.99),
+    (None, None, None, None, None, None),
+    (None, None, 'd2', 'Тарелка', 'Блюдо', 215.36),
+    (None, None, 'd3', 'Морс', 'Напиток', 200),
+    ('m2', 'Бар', None, None, None, None),
+]
+
+
+# Таблица из menus меню по submenus подменю по dishes блюд
+# со свежими id, чтобы не задеть строки из api/admin/Menu.xlsx
+def generated_cells(menus: int, submenus: int, dishes: int) -> list[tuple]:
+    cells: list[tuple] = []
+    for menu in range(menus):
+        cells.append((str(uuid.uuid4()), f'Меню {menu}', 'Описание', None, None, None))
+        for submenu in range(submenus):
+            cells.append((None, str(uuid.uuid4()), f'Подменю {submenu}', 'Описание', None, None))
+            for dish in range(dishes):
+                cells.append((None, None, str(uuid.uuid4()), f'Блюдо {dish}', 'Описание', f'{dish}.50'))
+    return cells
+
+
+def write_workbook(path: str, cells: list[tuple]) -> None:
+    workbook = Workbook()
+    for values in cells:
+        workbook.active.append(values)
+    workbook.save(path)
+
+
+@pytest_asyncio.fixture(scope='function')
+async def sync_calls(tmp_path, monkeypatch) -> AsyncGenerator[list, None]:
+    path = tmp_path / 'Menu.xlsx'
+    shutil.copy(tasks.XLSX_PATH, path)
+    prefix = f'xlsx-sync-pytest-{uuid.uuid4()}'
+    monkeypatch.setattr(tasks, 'XLSX_PATH', str(path))
+    monkeypatch.setattr(tasks, 'XLSX_FILE_KEY', f'{prefix}:file')
+    monkeypatch.setattr(tasks, 'XLSX_ROWS_KEY', f'{prefix}:rows')
+
+    calls = []
+
+    # Вместо запросов к API запоминаем, какие строки обработаны;
+    # API выдаёт строкам свои id, отличные от id в таблице
+    async def process_menu_row(row, app_url, client, db_id=None):
+        calls.append(row.id)
+        return {'id': db_id or f'db-{row.id}'}
+
+    async def process_submenu_row(row, menu_id, client, db_id=None):
+        calls.append(row.id)
+        return {'id': db_id or f'db-{row.id}'}
+
+    async def process_dish_row(row, menu_id, submenu_id, client, db_id=None):
+        calls.append((row.id, db_id) if db_id else row.id)
+        return {'id': db_id or f'db-{row.id}'}
+
+    monkeypatch.setattr(tasks, 'process_menu_row', process_menu_row)
+    monkeypatch.setattr(tasks, 'process_submenu_row', process_submenu_row)
+    monkeypatch.setattr(tasks, 'process_dish_row', process_dish_row)
+    yield calls
+    await redis_client.delete(tasks.XLSX_FILE_KEY, tasks.XLSX_ROWS_KEY)
+
+
+# Неизменённый файл не читается, даже если его перезаписали
+@pytest.mark.asyncio
+async def test_unchanged_workbook_is_skipped(sync_calls) -> None:
+    processed = await tasks.track_xlsx_to_db('/api/v1/menus')
+    assert processed == len(sync_calls) > 0
+
+    sync_calls.clear()
+    assert await tasks.track_xlsx_to_db('/api/v1/menus') is None
+
+    os.utime(tasks.XLSX_PATH)
+    assert await tasks.track_xlsx_to_db('/api/v1/menus') is None
+    assert sync_calls == []
+
+
+# В изменённом файле обрабатываются только изменённые строки,
+# по id в БД из прошлой синхронизации
+@pytest.mark.asyncio
+async def test_only_changed_rows_are_processed(sync_calls) -> None:
+    await tasks.track_xlsx_to_db('/api/v1/menus')
+    sync_calls.clear()
+
+    # Сбрасываем дайджест одного блюда, как будто строку отредактировали
+    await redis_client.hset(
+        tasks.XLSX_ROWS_KEY, DISH_ID, f'stale db-{DISH_ID}'
+    )
+    await redis_client.hset(tasks.XLSX_FILE_KEY, 'hash', 'stale')
+    os.utime(tasks.XLSX_PATH)
+
+    assert await tasks.track_xlsx_to_db('/api/v1/menus') == 1
+    assert sync_calls == [(DISH_ID, f'db-{DISH_ID}')]
+
+
+# Строка без изменений в API (обработчик ничего не вернул)
+# сохраняет прежний id в БД, а не id из таблицы
+@pytest.mark.asyncio
+async def test_unchanged_row_keeps_db_id(sync_calls, monkeypatch) -> None:
+    await tasks.track_xlsx_to_db('/api/v1/menus')
+
+    async def unchanged_dish_row(row, menu_id, submenu_id, client, db_id=None):
+        return None
+
+    monkeypatch.setattr(tasks, 'process_dish_row', unchanged_dish_row)
+    await redis_client.hset(
+        tasks.XLSX_ROWS_KEY, DISH_ID, f'stale db-{DISH_ID}'
+    )
+    await redis_client.hset(tasks.XLSX_FILE_KEY, 'hash', 'stale')
+    os.utime(tasks.XLSX_PATH)
+
+    assert await tasks.track_xlsx_to_db('/api/v1/menus') == 1
+    stored = await redis_client.hget(tasks.XLSX_ROWS_KEY, DISH_ID)
+    assert stored.decode().split(' ')[1] == f'db-{DISH_ID}'
+
+
+# В режиме 'db' таблица пишется в БД пакетно, счётчики пересчитываются
+@pytest.mark.asyncio
+async def test_db_mode_upserts_workbook(sync_calls, monkeypatch) -> None:
+    monkeypatch.setattr(tasks, 'XLSX_SYNC_MODE', 'db')
+    write_workbook(tasks.XLSX_PATH, generated_cells(2, 2, 3))
+    rows = list(read_menu_rows(tasks.XLSX_PATH))
+    menu_id = rows[0].id
+
+    try:
+        # Каждая строка таблицы - новое меню, подменю или блюдо
+        assert await tasks.track_xlsx_to_db('/api/v1/menus') == len(rows)
+        async with AsyncSessionLocal() as db:
+            menu = await db.get(Menu, uuid.UUID(menu_id))
+            dishes = await db.scalar(
+                select(func.count()).select_from(Dish)
+                .join(Submenu, Dish.submenu_id == Submenu.id)
+                .where(Submenu.menu_id == menu_id)
+            )
+        assert menu.dishes_count == dishes > 0
+        assert sync_calls == []
+
+        # Повторная запись той же таблицы ничего не меняет
+        # и не сбрасывает кэш
+        invalidated = []
+
+        async def record_invalidate(*tags):
+            invalidated.extend(tags)
+
+        monkeypatch.setattr(invalidation, 'invalidate', record_invalidate)
+        await redis_client.delete(tasks.XLSX_FILE_KEY, tasks.XLSX_ROWS_KEY)
+        assert await tasks.track_xlsx_to_db('/api/v1/menus') == 0
+        assert invalidated == []
+    finally:
+        async with AsyncSessionLocal() as db:
+            async with db.begin():
+                await db.execute(delete(Menu).where(
+                    Menu.id.in_([
+                        row.id for row in rows if isinstance(row, MenuRow)
+                    ])
+                ))
+
+
+# Родители отправляются раньше детей, соседние строки - параллельно,
+# но не больше XLSX_SYNC_CONCURRENCY сразу
+@pytest.mark.asyncio
+async def test_http_sync_is_bounded(sync_calls, monkeypatch) -> None:
+    monkeypatch.setattr(tasks, 'XLSX_SYNC_CONCURRENCY', 2)
+    in_flight, peak = 0, 0
+    process_dish_row = tasks.process_dish_row
+
+    async def slow_dish_row(row, menu_id, submenu_id, client, db_id=None):
+        nonlocal in_flight, peak
+        assert submenu_id.removeprefix('db-') in sync_calls
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return await process_dish_row(
+            row, menu_id, submenu_id, client, db_id
+        )
+
+    monkeypatch.setattr(tasks, 'process_dish_row', slow_dish_row)
+
+    assert await tasks.track_xlsx_to_db('/api/v1/menus') == len(sync_calls)
+    assert peak == 2
+
+
+# Строки разбираются по отступу и получают id родителей
+# Счётчики пересчитываются только у родителей, у которых появились
+# или ушли дети; правка полей строки их не затрагивает
+def test_regrouped_parents() -> None:
+    old = {'edited': 's1', 'moved': 's1'}
+    changed = {'edited': 's1', 'moved': 's2', 'inserted': 's3'}
+
+    assert left_parents(changed, old) == {'s1'}
+    assert regrouped_parents(changed, old) == {'s1', 's2', 's3'}
+    assert regrouped_parents({'edited': 's1'}, old) == set()
+
+
+def test_parse_rows_by_indent() -> None:
+    assert list(parse_rows(CELLS)) == [
+        MenuRow('m1', 'Меню', 'Основное'),
+        SubmenuRow('s1', 'Закуски', 'К пиву', 'm1'),
+        DishRow('d1', 'Сельдь', 'Блюдо', '182.99', 's1'),
+        DishRow('d2', 'Тарелка', 'Блюдо', '215.36', 's1'),
+        DishRow('d3', 'Морс', 'Напиток', '200', 's1'),
+        MenuRow('m2', 'Бар', None),
+    ]
+
+
+# Группы меню отдаются по одной, таблица не читается целиком
+def test_group_rows_is_lazy() -> None:
+    read = []
+
+    def rows():
+        for row in parse_rows(CELLS):
+            read.append(row.id)
+            yield row
+
+    groups = tasks.group_rows(rows())
+    menu, submenus = next(groups)
+
+    assert menu.id == 'm1'
+    assert [dish.id for dish in submenus[0][1]] == ['d1', 'd2', 'd3']
+    assert read == ['m1', 's1', 'd1', 'd2', 'd3', 'm2']
+    assert [menu.id for menu, _ in groups] == ['m2']
+
+
+# Векторный разбор даёт те же строки, что и построчный
+@pytest.mark.parametrize('cells', [
+    CELLS,
+    list(read_cells(tasks.XLSX_PATH)),
+])
+def test_parse_frames_matches_rows(cells) -> None:
+    rows = list(parse_rows(cells))
+    frames = parse_frames(pd.DataFrame(cells, dtype=object))
+
+    for frame, kind in zip(frames, (MenuRow, SubmenuRow, DishRow)):
+        assert frame.to_dict('records') == [
+            row.as_row() for row in rows if isinstance(row, kind)
+        ]
+
+
+# Кадры из файла совпадают с построчным чтением, целая цена - '200'
+def test_read_menu_frames_matches_rows(tmp_path) -> None:
+    path = str(tmp_path / 'Menu.xlsx')
+    write_workbook(path, CELLS)
+    rows = list(read_menu_rows(path))
+
+    frames = read_menu_frames(path)
+
+    assert frames[2]['price'].tolist() == ['182.99', '215.36', '200']
+    for frame, kind in zip(frames, (MenuRow, SubmenuRow, DishRow)):
+        assert frame.to_dict('records') == [
+            row.as_row() for row in rows if isinstance(row, kind)
+        ]
+
+
+# Блюдо под новым меню не наследует подменю предыдущего меню
+def test_dish_outside_submenu_is_rejected() -> None:
+    cells = CELLS + [(None, None, 'd4', 'Пиво', 'Светлое', 3.5)]
+
+    with pytest.raises(ValueError, match='Строка 8'):
+        list(parse_rows(cells))
+    with pytest.raises(ValueError, match='Строка 8'):
+        parse_frames(pd.DataFrame(cells, dtype=object))